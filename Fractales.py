@@ -27,6 +27,9 @@ st.markdown(
 
 
 def main():
+    # Compila los kernels en segundo plano mientras se elige el fractal
+    start_warmup()
+
     # Cambiar la fuente de texto
     st.write(
         """ <style>h1, h2, h3, h4, h5, h6 { font-family: 'roman'; } </style>""",
@@ -288,13 +291,121 @@ def main():
             ),
             help="La paleta de colores utilizada para la visualización del conjunto de Mandelbrot.",
         )
+        fast_interior_m = st.sidebar.checkbox(
+            "Detección rápida del interior",
+            value=False,
+            help="Descarta analíticamente la cardioide y el bulbo principal (z^2 + c) y detecta órbitas periódicas para terminar antes los puntos del interior. El resultado es idéntico.",
+        )
+        symmetric_m = st.sidebar.checkbox(
+            "Aprovechar la simetría",
+            value=True,
+            help="El conjunto es simétrico respecto al eje real (salvo para exp[(z^m - 1.00001 * z) / sqrt(c^3)]): si la vista cruza el eje, solo se calcula la mitad mayor y se refleja en la otra. Los píxeles reflejados se muestrean en posiciones redondeadas de otra forma, así que unos pocos del borde del conjunto (menos del 0,2%) pueden diferir del cálculo directo.",
+        )
+        engine_m = st.sidebar.selectbox(
+            "Motor de renderizado (Mandelbrot)",
+            ENGINES,
+            help="Mariani-Silver solo calcula los bordes de cada rectángulo y rellena los que tienen un borde uniforme, evitando la mayoría de los píxeles del interior; puede pasar por alto algún píxel aislado de los filamentos más finos que un píxel. El vectorizado itera 16 puntos de cada fila a la vez con instrucciones SIMD; los recuentos pueden diferir ligeramente en unos pocos píxeles del borde (menos del 0,5%) por el redondeo. Ambos solo para z^m + c y z^m + 1/c (el resto se calcula píxel a píxel).",
+        )
+        schedule_m = st.sidebar.selectbox(
+            "Reparto de filas entre hilos (Mandelbrot)",
+            SCHEDULES,
+            help="Con bloques contiguos, los hilos que reciben las filas del interior terminan mucho después que el resto. Las filas intercaladas y la cola dinámica reparten el trabajo por igual. Las iteraciones de cada hilo y su utilización se muestran en «📊 Estadísticas del render», bajo la imagen.",
+        )
+        threads_m = st.sidebar.number_input(
+            "Hilos de cálculo (Mandelbrot)",
+            min_value=1,
+            max_value=MAX_THREADS,
+            value=MAX_THREADS,
+            help="Número de hilos de Numba para este renderizado.",
+        )
+        precision_m = st.sidebar.selectbox(
+            "Precisión (Mandelbrot)",
+            PRECISIONS,
+            help="En precisión simple (float32) se calculan varios puntos de una fila a la vez con instrucciones vectoriales, varias veces más rápido. Solo para z^m + c y z^m + 1/c y el motor píxel a píxel; algunos puntos del borde pueden cambiar. La automática la usa cuando los píxeles son mucho mayores que la resolución de float32.",
+        )
+        smooth_m = st.sidebar.checkbox(
+            "Coloreado suave",
+            value=False,
+            help="Usa un número de iteraciones continuo (suavizado log-log con el |z| final) para eliminar las bandas de color. Se calcula en la misma pasada; usa siempre el motor píxel a píxel.",
+        )
+        histogram_m = st.sidebar.checkbox(
+            "Coloreado por histograma",
+            value=False,
+            help="Reparte la paleta según el histograma de iteraciones: cada color cubre más o menos el mismo número de píxeles, así que unos pocos píxeles lentos no comprimen el resto de la imagen en un par de colores y no hace falta ajustar k. El histograma se guarda en caché con el render, así que cambiar de paleta no vuelve a calcular nada.",
+        )
+        distance_m = st.sidebar.checkbox(
+            "Estimación de distancia",
+            value=False,
+            help="Colorea cada punto por su distancia estimada al conjunto, calculada con la derivada de la órbita: los filamentos más finos que un píxel se ven nítidos con n y k mucho menores. Solo para z^m + c y z^m + 1/c.",
+        )
+        antialias_m = st.sidebar.checkbox(
+            "Antialiasing adaptativo",
+            value=False,
+            help="Vuelve a muestrear con 4x4 puntos solo los píxeles del borde (los que difieren en más de una iteración de algún vecino) y les asigna la media: suaviza los dientes de sierra sin el coste de subir n. Solo con el número de iteraciones entero (sin coloreado suave ni estimación de distancia).",
+        )
+        annotated_m = st.sidebar.checkbox(
+            "Figura con ejes (matplotlib)",
+            value=False,
+            help="Dibuja la imagen con matplotlib, con ejes y título. Es más lento que la salida directa, sobre todo para n grandes.",
+        )
+        progressive_m = st.sidebar.checkbox(
+            "Renderizado progresivo",
+            value=False,
+            help="Muestra una vista previa a 1/8 de resolución casi al instante y la refina a 1/4, 1/2 y resolución completa reutilizando los puntos ya calculados. Solo con el motor píxel a píxel en doble precisión, sin coloreado suave, distancia ni antialiasing.",
+        )
+        tile_map_m = st.sidebar.checkbox(
+            "Mapa interactivo (teselas)",
+            value=False,
+            help="Muestra un mapa con zoom y desplazamiento servido por teselas de 256x256 que solo se calculan al entrar en la vista y se guardan en caché. Usa la función, m, k, la paleta y el coloreado elegidos; n y los rangos no se usan.",
+        )
+        deep_zoom = st.sidebar.checkbox(
+            "Zoom profundo (perturbaciones)",
+            value=False,
+            help="Calcula una órbita de referencia en alta precisión (mpmath) en el centro y el resto de píxeles como perturbaciones en float64. Permite zooms hasta 1e-100 con la función z^m + c.",
+        )
+        if deep_zoom:
+            center_x = st.sidebar.text_input(
+                "Centro, parte real",
+                value="-0.743643887037158704752191506114774",
+                help="Admite tantos decimales como necesite el zoom.",
+            )
+            center_y = st.sidebar.text_input(
+                "Centro, parte imaginaria",
+                value="0.131825904205311970493132056385139",
+                help="Admite tantos decimales como necesite el zoom.",
+            )
+            zoom = st.sidebar.number_input(
+                "Zoom (semiancho de la vista = 10^-zoom)",
+                min_value=0.0,
+                max_value=300.0,
+                value=10.0,
+                step=0.5,
+                help="Exponente del zoom. Los rangos de x e y se ignoran en este modo.",
+            )
+
+        if tile_map_m:
+            st_tile_map("mandelbrot", function_dict[selected_func], m, k_m, color_m, smooth=smooth_m)
 
         # Verificar si se ha presionado el botón "Generar Plot"
         if st.sidebar.button("🎨 Generar Fractal", type="primary", use_container_width=True):
             # Llamar a la función st_plot_mandelbrot con los parámetros ingresados
-            img_bytes, filename, execution_time = st_plot_mandelbrot(
-                n_m, k_m, Xr_m, Yr_m, color_m, selected_func, m
-            )
+            # Un único hueco para las vistas previas y la imagen final
+            image_slot = st.empty()
+            if deep_zoom:
+                with image_slot.container():
+                    img_bytes, filename, execution_time, stats = st_plot_mandelbrot_deep(
+                        n_m, k_m, center_x, center_y, zoom, color_m, m, annotated_m
+                    )
+            else:
+                preview_m = (
+                    progressive_m and engine_m == ENGINES[0] and not smooth_m and not distance_m and not antialias_m
+                    and precision_m == PRECISIONS[0]
+                )
+                with image_slot.container():
+                    img_bytes, filename, execution_time, stats = st_plot_mandelbrot(
+                        n_m, k_m, Xr_m, Yr_m, color_m, selected_func, m, fast_interior_m, engine_m, annotated_m, smooth_m,
+                        schedule_m, threads_m, precision_m, symmetric_m, distance_m, antialias_m, histogram_m, preview_m,
+                    )
             # Guardar en session state para persistencia simple (opcional, pero bueno para UX)
             st.session_state["mandelbrot_image"] = (img_bytes, filename)
             
@@ -309,6 +420,7 @@ def main():
                 else f"{round(seconds, 2)} segundos"
             )
             st.success(f"Tiempo de ejecución: {time_str}")
+            st_show_stats(stats)
             # Verificar si se pudo generar el gráfico
             if img_bytes is not None:
                 # Agregar un botón para descargar la imagen en formato PNG
@@ -450,13 +562,105 @@ def main():
             key="selectbox_color_j",
             help="La paleta de colores utilizada para la visualización del conjunto de Julia.",
         )
+        fast_interior_j = st.sidebar.checkbox(
+            "Detección rápida del interior",
+            value=False,
+            key="checkbox_fast_interior_j",
+            help="Detecta órbitas periódicas para terminar antes los puntos del interior. El resultado es idéntico.",
+        )
+        symmetric_j = st.sidebar.checkbox(
+            "Aprovechar la simetría",
+            value=True,
+            key="checkbox_symmetric_j",
+            help="Con m par el conjunto es simétrico respecto al origen, y con c real también respecto al eje real: si la vista cruza el eje o el origen, solo se calcula la mitad (o el cuadrante) mayor y se refleja en el resto. Los píxeles reflejados se muestrean en posiciones redondeadas de otra forma, así que unos pocos del borde del conjunto (menos del 0,2%) pueden diferir del cálculo directo.",
+        )
+        engine_j = st.sidebar.selectbox(
+            "Motor de renderizado (Julia)",
+            ENGINES,
+            key="selectbox_engine_j",
+            help="Mariani-Silver solo calcula los bordes de cada rectángulo y rellena los que tienen un borde uniforme, evitando la mayoría de los píxeles del interior; puede pasar por alto algún píxel aislado de los filamentos más finos que un píxel. El vectorizado itera 16 puntos de cada fila a la vez con instrucciones SIMD; los recuentos pueden diferir ligeramente en unos pocos píxeles del borde (menos del 0,5%) por el redondeo. Ambos solo para z^m + c y z^m + 1/c (el resto se calcula píxel a píxel).",
+        )
+        schedule_j = st.sidebar.selectbox(
+            "Reparto de filas entre hilos (Julia)",
+            SCHEDULES,
+            key="selectbox_schedule_j",
+            help="Con bloques contiguos, los hilos que reciben las filas del interior terminan mucho después que el resto. Las filas intercaladas y la cola dinámica reparten el trabajo por igual. Las iteraciones de cada hilo y su utilización se muestran en «📊 Estadísticas del render», bajo la imagen.",
+        )
+        threads_j = st.sidebar.number_input(
+            "Hilos de cálculo (Julia)",
+            min_value=1,
+            max_value=MAX_THREADS,
+            value=MAX_THREADS,
+            key="number_input_threads_j",
+            help="Número de hilos de Numba para este renderizado.",
+        )
+        precision_j = st.sidebar.selectbox(
+            "Precisión (Julia)",
+            PRECISIONS,
+            key="selectbox_precision_j",
+            help="En precisión simple (float32) se calculan varios puntos de una fila a la vez con instrucciones vectoriales, varias veces más rápido. Solo para z^m + c y z^m + 1/c y el motor píxel a píxel; algunos puntos del borde pueden cambiar. La automática la usa cuando los píxeles son mucho mayores que la resolución de float32.",
+        )
+        smooth_j = st.sidebar.checkbox(
+            "Coloreado suave",
+            value=False,
+            key="checkbox_smooth_j",
+            help="Usa un número de iteraciones continuo (suavizado log-log con el |z| final) para eliminar las bandas de color. Se calcula en la misma pasada; usa siempre el motor píxel a píxel.",
+        )
+        histogram_j = st.sidebar.checkbox(
+            "Coloreado por histograma",
+            value=False,
+            key="checkbox_histogram_j",
+            help="Reparte la paleta según el histograma de iteraciones: cada color cubre más o menos el mismo número de píxeles, así que unos pocos píxeles lentos no comprimen el resto de la imagen en un par de colores y no hace falta ajustar k. El histograma se guarda en caché con el render, así que cambiar de paleta no vuelve a calcular nada.",
+        )
+        distance_j = st.sidebar.checkbox(
+            "Estimación de distancia",
+            value=False,
+            key="checkbox_distance_j",
+            help="Colorea cada punto por su distancia estimada al conjunto, calculada con la derivada de la órbita: los filamentos más finos que un píxel se ven nítidos con n y k mucho menores. Solo para z^m + c y z^m + 1/c.",
+        )
+        antialias_j = st.sidebar.checkbox(
+            "Antialiasing adaptativo",
+            value=False,
+            key="checkbox_antialias_j",
+            help="Vuelve a muestrear con 4x4 puntos solo los píxeles del borde (los que difieren en más de una iteración de algún vecino) y les asigna la media: suaviza los dientes de sierra sin el coste de subir n. Solo con el número de iteraciones entero (sin coloreado suave ni estimación de distancia).",
+        )
+        annotated_j = st.sidebar.checkbox(
+            "Figura con ejes (matplotlib)",
+            value=False,
+            key="checkbox_annotated_j",
+            help="Dibuja la imagen con matplotlib, con ejes y título. Es más lento que la salida directa, sobre todo para n grandes.",
+        )
+        progressive_j = st.sidebar.checkbox(
+            "Renderizado progresivo",
+            value=False,
+            key="checkbox_progressive_j",
+            help="Muestra una vista previa a 1/8 de resolución casi al instante y la refina a 1/4, 1/2 y resolución completa reutilizando los puntos ya calculados. Solo con el motor píxel a píxel en doble precisión, sin coloreado suave, distancia ni antialiasing.",
+        )
+        tile_map_j = st.sidebar.checkbox(
+            "Mapa interactivo (teselas)",
+            value=False,
+            key="checkbox_tile_map_j",
+            help="Muestra un mapa con zoom y desplazamiento servido por teselas de 256x256 que solo se calculan al entrar en la vista y se guardan en caché. Usa la función, c, m, k, la paleta y el coloreado elegidos; n y los rangos no se usan.",
+        )
+
+        if tile_map_j:
+            st_tile_map(
+                "julia", funct_dict[selected_funct], m_j, k_j, color_j, complex(c_real, c_imag), smooth_j
+            )
 
         # Verificar si se ha presionado el botón "Generar Plot"
         if st.sidebar.button("🎨 Generar Fractal", type="primary", use_container_width=True, key="button_plot"):
             # Llamar a la función plot_julia con los parámetros ingresados
-            img_bytes, filename_j, execution_time_j = st_plot_julia(
-                n_j, c_real, c_imag, k_j, Xr_j, Yr_j, color_j, selected_funct, m_j
+            image_slot = st.empty()
+            preview_j = (
+                progressive_j and engine_j == ENGINES[0] and not smooth_j and not distance_j and not antialias_j
+                and precision_j == PRECISIONS[0]
             )
+            with image_slot.container():
+                img_bytes, filename_j, execution_time_j, stats_j = st_plot_julia(
+                    n_j, c_real, c_imag, k_j, Xr_j, Yr_j, color_j, selected_funct, m_j, fast_interior_j, engine_j, annotated_j, smooth_j,
+                    schedule_j, threads_j, precision_j, symmetric_j, distance_j, antialias_j, histogram_j, preview_j,
+                )
             # Guardar en session state
             st.session_state["julia_image"] = (img_bytes, filename_j)
 
@@ -471,6 +675,7 @@ def main():
                 else f"{round(seconds_j, 2)} segundos"
             )
             st.success(f"Tiempo de ejecución: {time_str}")
+            st_show_stats(stats_j)
             # Verificar si se pudo generar el gráfico
             if img_bytes is not None:
                 # Agregar un botón para descargar la imagen en formato PNG
@@ -1,76 +1,146 @@
 import matplotlib.pyplot as plt
 import matplotlib.animation as animation
+import numpy as np
 
+SQRT3_2 = np.sqrt(3) / 2
 
-def koch_curve(ax, x1, y1, x2, y2, iterations):
+# Vértices del triángulo inicial, recorrido en sentido antihorario y cerrado
+TRIANGLE = np.array([[0.0, 0.0], [1.0, 0.0], [0.5, SQRT3_2], [0.0, 0.0]])
+
+
+def koch_step(points):
     """
-    Función recursiva para dibujar la curva de Koch.
+    Aplica una iteración de la curva de Koch a una poligonal.
+
+    Cada segmento se sustituye por cuatro: el tercio central se reemplaza
+    por los dos lados de un triángulo equilátero hacia fuera. Todos los
+    segmentos se calculan a la vez con NumPy.
 
     Args:
-        ax: Axes object para dibujar la curva.
-        x1, y1, x2, y2: Coordenadas del segmento de línea inicial.
-        iterations: Número de iteraciones para generar la curva.
+        points: Array (N + 1, 2) con los vértices de la poligonal.
 
     Returns:
-        None
+        Array (4 N + 1, 2) con los vértices de la siguiente iteración.
     """
-    if iterations == 0:
-        # Caso base: dibujar un segmento de línea recta
-        ax.plot([x1, x2], [y1, y2], 'k-')
-    else:
-        # Cálculo de los puntos intermedios
-        x1_new = (2 * x1 + x2) / 3
-        y1_new = (2 * y1 + y2) / 3
-        x3 = (x1 + 2 * x2) / 3
-        y3 = (y1 + 2 * y2) / 3
-        x_mid = (x1_new + x3) / 2
-        y_mid = (y1_new + y3) / 2
-        x_peak = x_mid + (y3 - y1_new) * 0.866
-        y_peak = y_mid - (x3 - x1_new) * 0.866
-        
-        # Llamada recursiva para los segmentos más cortos
-        koch_curve(ax, x1, y1, x1_new, y1_new, iterations - 1)
-        koch_curve(ax, x1_new, y1_new, x_peak, y_peak, iterations - 1)
-        koch_curve(ax, x_peak, y_peak, x3, y3, iterations - 1)
-        koch_curve(ax, x3, y3, x2, y2, iterations - 1)
-
-
-# Configuración inicial
-fig, ax = plt.subplots()
-ax.set_aspect('equal')
-ax.axis('off')
-
-# Dibujo de la curva de Koch inicial
-koch_curve(ax, 0, 0, 1, 0, iterations=4)
-koch_curve(ax, 1, 0, 0.5, 0.866, iterations=4)
-koch_curve(ax, 0.5, 0.866, 0, 0, iterations=4)
-
-# Función de animación
-def animate(frame):
+    a = points[:-1]
+    d = (points[1:] - a) / 3
+    # Vértice del triángulo: punto medio del segmento más la normal hacia fuera
+    peak = a + 1.5 * d + SQRT3_2 * np.column_stack((d[:, 1], -d[:, 0]))
+
+    result = np.empty((4 * len(a) + 1, 2))
+    result[0:-1:4] = a
+    result[1::4] = a + d
+    result[2::4] = peak
+    result[3::4] = a + 2 * d
+    result[-1] = points[-1]
+    return result
+
+
+def koch_snowflake(iterations):
     """
-    Función de animación para generar el GIF.
+    Genera los vértices del copo de nieve de Koch.
 
     Args:
-        frame: Número de frame actual.
+        iterations: Número de iteraciones (0 es el triángulo).
 
     Returns:
-        None
+        Array (3 * 4^iterations + 1, 2) con la poligonal cerrada.
     """
-    ax.clear()
+    points = TRIANGLE
+    for _ in range(iterations):
+        points = koch_step(points)
+    return points
+
+
+def koch_levels(iterations):
+    """
+    Genera los vértices de todas las iteraciones hasta la dada, cada una a
+    partir de la anterior.
+
+    Args:
+        iterations: Última iteración.
+
+    Returns:
+        Lista con los vértices de las iteraciones 0 a iterations.
+    """
+    levels = [TRIANGLE]
+    for _ in range(iterations):
+        levels.append(koch_step(levels[-1]))
+    return levels
+
+
+def _setup_axes(ax, points):
     ax.set_aspect('equal')
     ax.axis('off')
-    iterations = frame + 1
-    koch_curve(ax, 0, 0, 1, 0, iterations=iterations)
-    koch_curve(ax, 1, 0, 0.5, 0.866, iterations=iterations)
-    koch_curve(ax, 0.5, 0.866, 0, 0, iterations=iterations)
+    margin = 0.02
+    ax.set_xlim(points[:, 0].min() - margin, points[:, 0].max() + margin)
+    ax.set_ylim(points[:, 1].min() - margin, points[:, 1].max() + margin)
+
+
+def plot_koch(iterations=4, ax=None):
+    """
+    Dibuja el copo de nieve de Koch como una única línea.
+
+    Args:
+        iterations: Número de iteraciones.
+        ax: Axes en el que dibujar; por defecto, uno nuevo.
 
-# Configuración de la animación
-frames = 5  # Número de iteraciones para el GIF
-interval = 1000  # Intervalo de tiempo entre cada frame en milisegundos
-ani = animation.FuncAnimation(fig, animate, frames=frames, interval=interval)
+    Returns:
+        El objeto Line2D dibujado.
+    """
+    if ax is None:
+        _, ax = plt.subplots()
+    points = koch_snowflake(iterations)
+    _setup_axes(ax, points)
+    line, = ax.plot(points[:, 0], points[:, 1], 'k-', linewidth=0.8)
+    return line
+
+
+def koch_animation(frames=5, interval=1000):
+    """
+    Crea la animación de las primeras iteraciones del copo de nieve.
+
+    Las iteraciones se calculan una vez y cada frame solo cambia los datos
+    de la línea, sin volver a dibujar la figura desde cero.
+
+    Args:
+        frames: Número de frames; el frame i muestra la iteración i + 1.
+        interval: Intervalo entre frames en milisegundos.
+
+    Returns:
+        Tupla (figura, FuncAnimation).
+    """
+    levels = koch_levels(frames)
+    fig, ax = plt.subplots()
+    _setup_axes(ax, levels[-1])
+    line, = ax.plot([], [], 'k-', linewidth=0.8)
+
+    def animate(frame):
+        points = levels[frame + 1]
+        line.set_data(points[:, 0], points[:, 1])
+        return line,
+
+    ani = animation.FuncAnimation(fig, animate, frames=frames, interval=interval, blit=True)
+    return fig, ani
+
+
+def save_koch_gif(filename='img/koch_fractal.gif', frames=5, interval=1000):
+    """
+    Guarda la animación del copo de nieve como GIF.
+
+    Args:
+        filename: Fichero de salida.
+        frames: Número de iteraciones del GIF.
+        interval: Intervalo entre frames en milisegundos.
+
+    Returns:
+        La figura de la animación.
+    """
+    fig, ani = koch_animation(frames, interval)
+    ani.save(filename, writer='pillow')
+    return fig
 
-# Guardar la animación como un GIF
-filename = 'img/koch_fractal.gif'
-ani.save(filename, writer='pillow')
 
-plt.show()
+if __name__ == '__main__':
+    save_koch_gif()
+    plt.show()
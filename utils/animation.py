@@ -0,0 +1,277 @@
+import argparse
+import math
+import os
+import queue
+import shutil
+import subprocess
+import threading
+import time
+
+import numpy as np
+
+from utils.colorize import colorize, encode_png
+from utils.precision import PRECISIONS
+from utils.render import ENGINES, compute_mandelbrot_view, compute_julia_view
+from utils.symmetry import julia_symmetry, render_symmetric
+
+# Animations: Mandelbrot zooms and Julia sweeps of c, encoded as video.
+#
+#     python -m utils.animation zoom --center -0.743643887 0.131825904 --zoom 1e4 --frames 600 --out zoom.mp4
+#     python -m utils.animation julia --c -0.8 0.156 --c -0.7 0.3 --frames 240 --out julia.mp4
+#
+# A zoom does not render every frame. A keyframe is rendered KEY_SCALE times
+# wider and taller (in pixels) than the video, and every following frame
+# whose view is at least 1 / KEY_SCALE of the keyframe's is cut from it and
+# resampled, so a zoom by a factor Z costs about log(Z) / log(KEY_SCALE)
+# renders of KEY_SCALE^2 frames each (a 600 frame zoom by 10^4 renders 14
+# keyframes). Frames near the keyframe are downsampled, which antialiases
+# them. Colors are normalized between 0 and k in every frame, so they do not
+# jump between keyframes.
+#
+# Julia frames have nothing in common but their symmetry, which render
+# uses; every frame is rendered.
+#
+# Rendering runs on the calling thread and resampling and encoding on
+# another one (the kernels release the GIL), with at most QUEUE_ITEMS
+# renders waiting in between, so memory does not grow with the number of
+# frames. Frames are piped raw to ffmpeg; without it they are written as a
+# numbered PNG sequence.
+
+FPS = 30
+WIDTH, HEIGHT = 640, 360  # even, as yuv420p video needs
+KEY_SCALE = 2.0
+QUEUE_ITEMS = 2
+FFMPEG = shutil.which("ffmpeg")
+VIDEO_CODECS = {
+    ".mp4": ["-c:v", "libx264", "-pix_fmt", "yuv420p", "-crf", "18"],
+    ".mkv": ["-c:v", "libx264", "-pix_fmt", "yuv420p", "-crf", "18"],
+    ".webm": ["-c:v", "libvpx-vp9", "-pix_fmt", "yuv420p", "-b:v", "0", "-crf", "30"],
+    ".gif": ["-vf", "split[a][b];[a]palettegen[p];[b][p]paletteuse"],
+}
+
+
+class FfmpegWriter:
+    # Pipes raw RGB frames into an ffmpeg process, which encodes them in
+    # parallel with the rendering
+    def __init__(self, path, w, h, fps=FPS):
+        self.path = path
+        codec = VIDEO_CODECS[os.path.splitext(path)[1].lower()]
+        self.process = subprocess.Popen(
+            [
+                FFMPEG, "-y", "-loglevel", "error", "-f", "rawvideo", "-pix_fmt", "rgb24",
+                "-s", f"{w}x{h}", "-r", str(fps), "-i", "-", *codec, path,
+            ],
+            stdin=subprocess.PIPE,
+        )
+
+    def write(self, rgb):
+        self.process.stdin.write(np.ascontiguousarray(rgb).tobytes())
+
+    def close(self):
+        self.process.stdin.close()
+        if self.process.wait():
+            raise RuntimeError(f"ffmpeg terminó con el código {self.process.returncode}")
+
+
+class PngSequenceWriter:
+    # Fallback without ffmpeg: frame_00000.png, frame_00001.png, ... in a
+    # directory named after the output
+    def __init__(self, path, fps=FPS):
+        self.directory = os.path.splitext(path)[0] + "_frames"
+        self.fps = fps
+        self.frames = 0
+        os.makedirs(self.directory, exist_ok=True)
+
+    def write(self, rgb):
+        with open(os.path.join(self.directory, f"frame_{self.frames:05d}.png"), "wb") as f:
+            f.write(encode_png(rgb))
+        self.frames += 1
+
+    def close(self):
+        pattern = os.path.join(self.directory, "frame_%05d.png")
+        print(f"Fotogramas en {self.directory}; para montar el vídeo: ffmpeg -r {self.fps} -i {pattern} video.mp4")
+
+
+def open_writer(path, w, h, fps=FPS):
+    if FFMPEG and os.path.splitext(path)[1].lower() in VIDEO_CODECS:
+        return FfmpegWriter(path, w, h, fps)
+    if not FFMPEG:
+        print("ffmpeg no encontrado, se guardan los fotogramas como PNG")
+    return PngSequenceWriter(path, fps)
+
+
+def zoom_widths(width, zoom, frames):
+    # View width of every frame, shrinking geometrically from width to
+    # width / zoom
+    return [width * zoom ** (-f / max(frames - 1, 1)) for f in range(frames)]
+
+
+def keyframes(widths, scale=KEY_SCALE):
+    # Groups consecutive frames by the keyframe they are cut from; returns
+    # (keyframe width, frame indices) pairs. widths must not grow.
+    groups = []
+    for f, width in enumerate(widths):
+        if groups and width * scale >= groups[-1][0]:
+            groups[-1][1].append(f)
+        else:
+            groups.append((width, [f]))
+    return groups
+
+
+def crop_box(width, key_width, key_w, key_h):
+    # Pixel box (left, top, right, bottom) of a centered view of `width`
+    # inside a keyframe of key_w x key_h pixels covering key_width
+    fraction = width / key_width
+    half_w = key_w * fraction / 2
+    half_h = key_h * fraction / 2
+    return (key_w / 2 - half_w, key_h / 2 - half_h, key_w / 2 + half_w, key_h / 2 + half_h)
+
+
+def resample(rgb, box, w, h):
+    from PIL import Image
+
+    return np.asarray(Image.fromarray(rgb).resize((w, h), Image.BILINEAR, box=box))
+
+
+def encode_frames(items, writer, w, h):
+    # Consumer thread: items are (rgb, boxes) with one crop box per frame,
+    # or None for an rgb that already is the frame; a final None stops it
+    while True:
+        item = items.get()
+        if item is None:
+            return
+        rgb, boxes = item
+        if boxes is None:
+            writer.write(rgb)
+        else:
+            for box in boxes:
+                writer.write(resample(rgb, box, w, h))
+
+
+def pipeline(renders, writer, w, h):
+    # Runs `renders` (a generator of queue items) on this thread and the
+    # encoding on another one
+    items = queue.Queue(maxsize=QUEUE_ITEMS)
+    errors = []
+
+    def consume():
+        try:
+            encode_frames(items, writer, w, h)
+        except BaseException as e:
+            errors.append(e)
+            # Keep draining so the producer is never blocked
+            while items.get() is not None:
+                pass
+
+    encoder = threading.Thread(target=consume, name="encoder")
+    encoder.start()
+    try:
+        for item in renders:
+            items.put(item)
+            if errors:
+                break
+    finally:
+        items.put(None)
+        encoder.join()
+    if errors:
+        raise errors[0]
+    writer.close()
+
+
+def zoom_renders(center, width, zoom, frames, w, h, k, func_id=0, m=2, cmap="hot", engine=ENGINES[0], precision=PRECISIONS[0], scale=KEY_SCALE):
+    # Keyframes of a Mandelbrot zoom towards `center`, as pipeline items
+    cx, cy = center
+    key_w, key_h = math.ceil(scale * w), math.ceil(scale * h)
+    widths = zoom_widths(width, zoom, frames)
+    for key_width, indices in keyframes(widths, scale):
+        key_height = key_width * h / w
+        W = compute_mandelbrot_view(
+            key_h, key_w, k, cx - key_width / 2, cx + key_width / 2, cy - key_height / 2, cy + key_height / 2,
+            func_id, m, fast_interior=True, engine=engine, precision=precision,
+        )
+        yield colorize(W, cmap, 0, k), [crop_box(widths[f], key_width, key_w, key_h) for f in indices]
+
+
+def julia_path(cs, frames):
+    # frames values of c along the polyline through cs, evenly spaced by
+    # length; a path whose ends match loops
+    cs = [complex(c) for c in cs]
+    if len(cs) == 1:
+        return [cs[0]] * frames
+    lengths = np.abs(np.diff(cs))
+    total = lengths.sum()
+    ends = np.concatenate([[0.0], np.cumsum(lengths)])
+    closed = cs[0] == cs[-1]
+    path = []
+    for f in range(frames):
+        s = total * f / (frames if closed else max(frames - 1, 1))
+        i = min(np.searchsorted(ends, s, side="right") - 1, len(cs) - 2)
+        t = (s - ends[i]) / lengths[i] if lengths[i] else 0.0
+        path.append(cs[i] + t * (cs[i + 1] - cs[i]))
+    return path
+
+
+def julia_renders(cs, frames, w, h, k, func_id=0, m_j=2, cmap="hot", view=(-2.0, 2.0), engine=ENGINES[0], precision=PRECISIONS[0]):
+    x_min, x_max = view
+    y_max = (x_max - x_min) * h / w / 2
+    for c in julia_path(cs, frames):
+
+        def compute_view(h, w, x_min, x_max, y_min, y_max, c=c):
+            return compute_julia_view(
+                h, w, k, x_min, x_max, y_min, y_max, func_id, c, m_j, fast_interior=True, engine=engine, precision=precision
+            )
+
+        W = render_symmetric(compute_view, h, w, x_min, x_max, -y_max, y_max, julia_symmetry(c, m_j))
+        yield colorize(W, cmap, 0, k), None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m utils.animation",
+        description="Genera vídeos de zoom en el conjunto de Mandelbrot o de barrido de c en conjuntos de Julia.",
+    )
+    parser.add_argument("kind", choices=["zoom", "julia"])
+    parser.add_argument("--out", required=True, help="Vídeo de salida (.mp4, .mkv, .webm o .gif)")
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--fps", type=int, default=FPS)
+    parser.add_argument("--size", type=int, nargs=2, default=(WIDTH, HEIGHT), metavar=("ANCHO", "ALTO"))
+    parser.add_argument("--k", type=int, default=300)
+    parser.add_argument("--func", type=int, default=0)
+    parser.add_argument("--m", type=int, default=2)
+    parser.add_argument("--color", default="hot")
+    parser.add_argument("--engine", type=int, default=2, help="Índice en ENGINES (por defecto, el vectorizado)")
+    parser.add_argument("--precision", type=int, default=0, help="Índice en PRECISIONS")
+    parser.add_argument("--center", type=float, nargs=2, default=(-0.743643887, 0.131825904), help="Centro del zoom")
+    parser.add_argument("--width", type=float, default=3.0, help="Ancho de la vista inicial del zoom")
+    parser.add_argument("--zoom", type=float, default=1e4, help="Aumento total del zoom (>= 1)")
+    parser.add_argument("--scale", type=float, default=KEY_SCALE, help="Tamaño de los fotogramas clave respecto al vídeo")
+    parser.add_argument(
+        "--c", type=float, nargs=2, action="append", metavar=("RE", "IM"),
+        help="Puntos del recorrido de c de Julia; se puede repetir",
+    )
+    args = parser.parse_args(argv)
+
+    w, h = args.size
+    if args.kind == "zoom" and (args.zoom < 1 or args.scale <= 1):
+        parser.error("--zoom tiene que ser al menos 1 y --scale mayor que 1")
+    writer = open_writer(args.out, w, h, args.fps)
+    engine, precision = ENGINES[args.engine], PRECISIONS[args.precision]
+
+    start = time.perf_counter()
+    if args.kind == "zoom":
+        groups = keyframes(zoom_widths(args.width, args.zoom, args.frames), args.scale)
+        renders = zoom_renders(
+            args.center, args.width, args.zoom, args.frames, w, h, args.k, args.func, args.m, args.color,
+            engine, precision, args.scale,
+        )
+        rendered = len(groups)
+    else:
+        cs = [complex(*c) for c in args.c or [(-0.8, 0.156), (-0.7, 0.3), (-0.8, 0.156)]]
+        renders = julia_renders(cs, args.frames, w, h, args.k, args.func, args.m, args.color, engine=engine, precision=precision)
+        rendered = args.frames
+    pipeline(renders, writer, w, h)
+    print(f"{args.frames} fotogramas a partir de {rendered} renders en {time.perf_counter() - start:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
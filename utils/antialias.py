@@ -0,0 +1,147 @@
+import numpy as np
+from numba import jit, prange
+
+from utils.kernels import FORMULAS, JULIA_FORMULAS, ITERATE_PERIODIC, add_work, in_cardioid_or_bulb, kernel_lock
+from utils.stats import count, count_work, new_work
+
+# Adaptive supersampling.
+#
+# A render samples every pixel once, so the boundary of the set aliases.
+# Raising n supersamples the whole image, flat regions included. Instead,
+# only the pixels whose count differs from one of their 8 neighbours by
+# more than AA_THRESHOLD are sampled again, at AA_SAMPLES x AA_SAMPLES
+# points: one at a random position inside every cell of a regular grid
+# over the pixel (jittered, so the pattern does not alias in turn). The
+# grid is centered on the pixel's sample, so the pixels mirrored by
+# symmetry.py cover the same area as in a direct render. Their mean count
+# replaces the pixel; the rest keep their single sample.
+#
+# Counts that differ by one are the bands of the exterior, which are not
+# aliasing, so by default they do not trigger it. The jitter comes from a
+# fixed seed, so a render is reproducible (and cacheable).
+
+AA_SAMPLES = 4  # per side of the pixel
+AA_THRESHOLD = 1  # largest count difference with a neighbour left alone
+AA_SEED = 0
+
+
+def make_mandelbrot_supersample_kernel(f, has_bulbs):
+    # Mean count of the pixels (rows[t], cols[t]) over the sample offsets in
+    # `jitter`, given in pixels from the sample of each. Edge pixels are
+    # often half inside the set, so the samples skip the cardioid and bulb
+    # and stop periodic orbits early; the counts are the same. Only the
+    # iterations go to `work`: the samples are not pixels of the image.
+    @jit(nopython=True, fastmath=True, parallel=True, cache=True)
+    def kernel(rows, cols, h, w, k, x_min, x_max, y_min, y_max, m, jitter, work):
+        result = np.empty(rows.size, dtype=np.float32)
+
+        dx = (x_max - x_min) / w
+        dy = (y_max - y_min) / h
+        samples = jitter.shape[0]
+
+        for t in prange(rows.size):
+            total = 0
+            iterations = 0
+            for s in range(samples):
+                x = x_min + (cols[t] + jitter[s, 0]) * dx
+                y = y_min + (rows[t] + jitter[s, 1]) * dy
+                if has_bulbs and m == 2 and in_cardioid_or_bulb(x, y):
+                    total += k
+                else:
+                    n, _, steps = ITERATE_PERIODIC(f, 0.0j, complex(x, y), 0, k, m, 4.0)
+                    total += n
+                    iterations += steps
+            result[t] = total / samples
+            add_work(work, iterations, 0, 0)
+
+        return result
+
+    return kernel
+
+
+def make_julia_supersample_kernel(f):
+    @jit(nopython=True, fastmath=True, parallel=True, cache=True)
+    def kernel(rows, cols, h, w, k, x_min, x_max, y_min, y_max, c, m_j, jitter, work):
+        result = np.empty(rows.size, dtype=np.float32)
+
+        dx = (x_max - x_min) / w
+        dy = (y_max - y_min) / h
+        samples = jitter.shape[0]
+
+        R = max(abs(c), 2.0)
+        R2 = R * R
+
+        for t in prange(rows.size):
+            total = 0
+            iterations = 0
+            for s in range(samples):
+                x = x_min + (cols[t] + jitter[s, 0]) * dx
+                y = y_min + (rows[t] + jitter[s, 1]) * dy
+                n, _, steps = ITERATE_PERIODIC(f, complex(x, y), c, 0, k, m_j, R2)
+                total += n
+                iterations += steps
+            result[t] = total / samples
+            add_work(work, iterations, 0, 0)
+
+        return result
+
+    return kernel
+
+
+MANDELBROT_SUPERSAMPLE_KERNELS = [make_mandelbrot_supersample_kernel(f, f == 0) for f in range(len(FORMULAS))]
+JULIA_SUPERSAMPLE_KERNELS = [make_julia_supersample_kernel(f) for f in JULIA_FORMULAS]
+
+
+def jitter_pattern(samples=AA_SAMPLES, seed=AA_SEED):
+    # (samples^2, 2) offsets in [-0.5, 0.5): one random point in every cell
+    # of a samples x samples grid over the pixel
+    rng = np.random.default_rng(seed)
+    a, b = np.meshgrid(np.arange(samples), np.arange(samples))
+    cells = np.column_stack((a.ravel(), b.ravel()))
+    return (cells + rng.random(cells.shape)) / samples - 0.5
+
+
+def edge_pixels(W, threshold=AA_THRESHOLD):
+    # Mask of the pixels whose count differs from one of their 8 neighbours
+    # by more than threshold
+    h, w = W.shape
+    P = np.pad(W.astype(np.int64), 1, mode="edge")
+    edges = np.zeros((h, w), dtype=bool)
+    for di in (-1, 0, 1):
+        for dj in (-1, 0, 1):
+            if di or dj:
+                edges |= np.abs(P[1 + di:1 + di + h, 1 + dj:1 + dj + w] - P[1:-1, 1:-1]) > threshold
+    return edges
+
+
+def _refine(W, threshold, samples, supersample):
+    # supersample(rows, cols, jitter, work) -> mean counts of those pixels
+    rows, cols = np.divmod(np.flatnonzero(edge_pixels(W, threshold)), W.shape[1])
+    result = W.astype(np.float32)
+    if rows.size:
+        work = new_work()
+        with kernel_lock:
+            result[rows, cols] = supersample(rows, cols, jitter_pattern(samples), work)
+        count_work(work)
+    count(antialiased_pixels=int(rows.size), antialias_samples=int(rows.size) * samples * samples)
+    return result
+
+
+def antialias_mandelbrot(W, k, x_min, x_max, y_min, y_max, func_id, m, samples=AA_SAMPLES, threshold=AA_THRESHOLD):
+    # W is the integer count array of the view; returns float32 counts with
+    # the edge pixels averaged over samples^2 points
+    h, w = W.shape
+    kernel = MANDELBROT_SUPERSAMPLE_KERNELS[func_id]
+    return _refine(
+        W, threshold, samples,
+        lambda rows, cols, jitter, work: kernel(rows, cols, h, w, k, x_min, x_max, y_min, y_max, m, jitter, work),
+    )
+
+
+def antialias_julia(W, k, x_min, x_max, y_min, y_max, func_id, c, m_j, samples=AA_SAMPLES, threshold=AA_THRESHOLD):
+    h, w = W.shape
+    kernel = JULIA_SUPERSAMPLE_KERNELS[func_id]
+    return _refine(
+        W, threshold, samples,
+        lambda rows, cols, jitter, work: kernel(rows, cols, h, w, k, x_min, x_max, y_min, y_max, complex(c), m_j, jitter, work),
+    )
@@ -0,0 +1,245 @@
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from joblib import Parallel, delayed, parallel_config
+
+from utils.formulas import function_dict, funct_dict
+from utils.render import ENGINES, render_mandelbrot, render_julia
+from utils.cache import RenderCache
+from utils.colorize import colorize, encode_png
+from utils.strips import OUT_OF_CORE_PIXELS, mandelbrot_rows, julia_rows, render_poster
+
+# Headless batch renderer: renders a list of jobs to PNG files in parallel,
+# without Streamlit.
+#
+#     python -m utils.batch jobs.json --out img/galeria --workers 4
+#
+# The job file is a JSON list of objects. Every field but "fractal" is
+# optional and defaults to the values of the app:
+#
+#     {"fractal": "mandelbrot", "func": "Fractal de Mandelbrot del tipo z = z^m + c",
+#      "m": 2, "n": 1200, "k": 100, "x": [-2.0, 1.0], "y": [-1.0, 1.0],
+#      "color": "hot", "engine": 0, "smooth": false, "name": "mandelbrot.png"}
+#     {"fractal": "julia", "func": "Fractal de Julia del tipo z^m + c",
+#      "c": [0.0, -1.0], "m": 2, "n": 1500, "k": 100, "x": [-2.0, 2.0], "y": [-2.0, 2.0]}
+#
+# "func" is a name from MANDELBROT_FUNCS / JULIA_FUNCS and "engine" an index
+# or name from ENGINES.
+#
+# Every worker process runs its kernels with cores // workers Numba threads,
+# so the pool never oversubscribes the machine: few workers with many
+# threads suit a few large images, many single-threaded workers suit many
+# small ones. Images are written atomically, so an interrupted batch is
+# resumed by running it again; finished jobs are skipped and their timings
+# are appended to progress.jsonl in the output directory.
+#
+# Jobs larger than OUT_OF_CORE_PIXELS skip the render cache and are rendered
+# in strips straight to the PNG (see strips.py), so a poster does not need
+# its whole iteration array and image in memory.
+
+PROGRESS_FILE = "progress.jsonl"
+
+MANDELBROT_DEFAULTS = dict(func=0, m=2, n=1200, k=100, x=(-2.0, 1.0), y=(-1.0, 1.0))
+JULIA_DEFAULTS = dict(func=0, m=2, n=1500, k=100, x=(-2.0, 2.0), y=(-2.0, 2.0), c=(0.0, -1.0))
+
+
+def _lookup(names, value, what):
+    # Accepts a name or an index into `names`
+    if isinstance(value, int):
+        if not 0 <= value < len(names):
+            raise ValueError(f"{what}: índice fuera de rango {value}")
+        return value
+    if value not in names:
+        raise ValueError(f"{what}: valor desconocido {value!r}")
+    return names[value]
+
+
+def parse_job(job):
+    # Validates a job and fills in the defaults; returns a flat dict with
+    # resolved ids so the workers need no lookups
+    fractal = job.get("fractal")
+    if fractal == "mandelbrot":
+        defaults, funcs = MANDELBROT_DEFAULTS, function_dict
+    elif fractal == "julia":
+        defaults, funcs = JULIA_DEFAULTS, funct_dict
+    else:
+        raise ValueError(f"Tipo de fractal desconocido: {fractal!r}")
+
+    unknown = set(job) - set(defaults) - {"fractal", "color", "engine", "smooth", "name"}
+    if unknown:
+        raise ValueError(f"Campos desconocidos: {sorted(unknown)}")
+
+    spec = {**defaults, "color": "hot", "engine": 0, "smooth": False, **job}
+    spec["func_id"] = _lookup(funcs, spec.pop("func"), "Función")
+    spec["engine"] = ENGINES[_lookup({e: i for i, e in enumerate(ENGINES)}, spec["engine"], "Motor")]
+    spec["m"] = int(spec["m"])
+    spec["n"] = int(spec["n"])
+    spec["k"] = int(spec["k"])
+    spec["smooth"] = bool(spec["smooth"])
+    spec["x"] = tuple(float(v) for v in spec["x"])
+    spec["y"] = tuple(float(v) for v in spec["y"])
+    if fractal == "julia":
+        spec["c"] = complex(*spec["c"])
+    if "name" not in spec:
+        # Stable name from the parameters, so reruns find their output
+        params = {key: spec[key] for key in spec if key != "name"}
+        spec["name"] = f"{fractal}_{spec['func_id']}_m{spec['m']}_n{spec['n']}_k{spec['k']}_{RenderCache.key(**params)[:12]}.png"
+    return spec
+
+
+def load_jobs(path):
+    with open(path, encoding="utf-8") as f:
+        jobs = json.load(f)
+    if isinstance(jobs, dict):
+        jobs = jobs["jobs"]
+
+    specs = []
+    for i, job in enumerate(jobs):
+        try:
+            specs.append(parse_job(job))
+        except (ValueError, TypeError, KeyError) as e:
+            raise ValueError(f"Trabajo {i}: {e}") from None
+    names = [spec["name"] for spec in specs]
+    if len(set(names)) != len(names):
+        raise ValueError("Hay trabajos con el mismo nombre de salida")
+    return specs
+
+
+def render_job(spec):
+    # Iteration array of a job, through the shared disk cache. Batch renders
+    # are one-off, so the orbits are not kept for incremental deepening.
+    x_min, x_max = spec["x"]
+    y_min, y_max = spec["y"]
+    if spec["fractal"] == "mandelbrot":
+        return render_mandelbrot(
+            spec["n"], spec["k"], x_min, x_max, y_min, y_max, spec["func_id"], spec["m"],
+            engine=spec["engine"], smooth=spec["smooth"], resume=False,
+        )
+    return render_julia(
+        spec["n"], spec["k"], x_min, x_max, y_min, y_max, spec["func_id"], spec["c"], spec["m"],
+        engine=spec["engine"], smooth=spec["smooth"], resume=False,
+    )
+
+
+def job_rows(spec):
+    # (h, w, compute_rows) of a job for the strip renderer
+    x_min, x_max = spec["x"]
+    y_min, y_max = spec["y"]
+    if spec["fractal"] == "mandelbrot":
+        return mandelbrot_rows(
+            spec["n"], spec["k"], x_min, x_max, y_min, y_max, spec["func_id"], spec["m"],
+            engine=spec["engine"], smooth=spec["smooth"],
+        )
+    return julia_rows(
+        spec["n"], spec["k"], x_min, x_max, y_min, y_max, spec["func_id"], spec["c"], spec["m"],
+        engine=spec["engine"], smooth=spec["smooth"],
+    )
+
+
+def write_atomic(path, data):
+    directory = os.path.dirname(path) or "."
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def run_job(index, spec, path, threads):
+    # Runs in a worker process
+    import numba
+
+    numba.set_num_threads(min(threads, numba.config.NUMBA_NUM_THREADS))
+
+    h, w, compute_rows = job_rows(spec)
+    if h * w > OUT_OF_CORE_PIXELS:
+        compute_time, total_time = render_poster(path, h, w, compute_rows, spec["color"], spec["smooth"])
+    else:
+        start = time.perf_counter()
+        W = render_job(spec)
+        compute_time = time.perf_counter() - start
+        write_atomic(path, encode_png(colorize(W, spec["color"])))
+        total_time = time.perf_counter() - start
+    return dict(
+        job=index, name=spec["name"], shape=[h, w],
+        compute_seconds=round(compute_time, 4), seconds=round(total_time, 4),
+        pid=os.getpid(), threads=threads,
+    )
+
+
+def plan_workers(pending, workers=None, threads=None, cores=None):
+    # Splits the cores between worker processes and Numba threads per worker
+    cores = cores or os.cpu_count() or 1
+    if workers is None:
+        workers = max(1, min(pending, cores // threads if threads else cores))
+    if threads is None:
+        threads = max(1, cores // workers)
+    return workers, threads
+
+
+def run_batch(specs, out_dir, workers=None, threads=None, force=False):
+    os.makedirs(out_dir, exist_ok=True)
+    pending = [
+        (i, spec) for i, spec in enumerate(specs)
+        if force or not os.path.exists(os.path.join(out_dir, spec["name"]))
+    ]
+    skipped = len(specs) - len(pending)
+    if skipped:
+        print(f"{skipped} de {len(specs)} trabajos ya estaban hechos")
+    if not pending:
+        return []
+
+    workers, threads = plan_workers(len(pending), workers, threads)
+    print(f"{len(pending)} trabajos con {workers} procesos x {threads} hilos")
+
+    start = time.perf_counter()
+    results = []
+    tasks = (
+        delayed(run_job)(i, spec, os.path.join(out_dir, spec["name"]), threads)
+        for i, spec in pending
+    )
+    with open(os.path.join(out_dir, PROGRESS_FILE), "a", encoding="utf-8") as progress:
+        with parallel_config(backend="loky", inner_max_num_threads=threads):
+            for result in Parallel(n_jobs=workers, return_as="generator_unordered")(tasks):
+                results.append(result)
+                progress.write(json.dumps(result) + "\n")
+                progress.flush()
+                print(
+                    f"[{len(results)}/{len(pending)}] {result['name']}: "
+                    f"{result['seconds']:.2f} s (cálculo {result['compute_seconds']:.2f} s)"
+                )
+
+    total = time.perf_counter() - start
+    busy = sum(result["seconds"] for result in results)
+    print(f"Tiempo total: {total:.2f} s, suma de trabajos: {busy:.2f} s")
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m utils.batch",
+        description="Renderiza por lotes conjuntos de Mandelbrot y Julia sin Streamlit.",
+    )
+    parser.add_argument("jobs", help="Fichero JSON con la lista de trabajos")
+    parser.add_argument("--out", default="img/batch", help="Directorio de salida (por defecto img/batch)")
+    parser.add_argument("--workers", type=int, help="Número de procesos (por defecto, uno por núcleo hasta el número de trabajos)")
+    parser.add_argument("--threads", type=int, help="Hilos de Numba por proceso (por defecto, núcleos / procesos)")
+    parser.add_argument("--force", action="store_true", help="Vuelve a renderizar los trabajos ya hechos")
+    args = parser.parse_args(argv)
+
+    try:
+        specs = load_jobs(args.jobs)
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+    run_batch(specs, args.out, args.workers, args.threads, args.force)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,265 @@
+import argparse
+import itertools
+import json
+import platform
+import sys
+import time
+
+import numba
+import numpy as np
+
+from utils.formulas import MANDELBROT_FUNCS, JULIA_FUNCS
+from utils.render import (
+    compute_mandelbrot_numba, compute_julia_numba, compute_mandelbrot_lanes, compute_julia_lanes, julia_height,
+)
+from utils.lanes import MANDELBROT_LANE_KERNELS, JULIA_LANE_KERNELS, MAX_MISMATCH
+from utils.precision import PRECISIONS, MANDELBROT_FLOAT32_KERNELS, JULIA_FLOAT32_KERNELS
+
+# Benchmark of the escape-time kernels.
+#
+#     python -m utils.benchmark --save bench.json
+#     python -m utils.benchmark --baseline bench.json
+#
+# Every formula of MANDELBROT_FUNCS and JULIA_FUNCS is rendered over a grid of
+# n, k and m on the default view of its page. The first call of a kernel
+# includes its JIT compilation, so it is timed apart: jit_seconds is the
+# first call minus the steady-state time, which is the best of `repeat`
+# further calls. Throughput is reported as pixels/s and iterations/s (the
+# iteration count of every pixel is what the kernel returns).
+#
+# --precision float32 (or auto) adds the cases of the formulas that have
+# float32 kernels, and their speedup over float64 is printed at the end.
+# --engine lanes does the same for the lane-batched float64 kernels, whose
+# speedup is over the pixel-by-pixel ones (float32 always runs on lanes).
+# Their counts are also compared with the pixel-by-pixel ones, and the run
+# fails if more than MAX_MISMATCH of the pixels differ (see lanes.py).
+#
+# With --baseline, every case is compared with the one of the same
+# parameters in a previous run and cases slower by more than the tolerance
+# are flagged as regressions; the exit status is 1 if there is any.
+
+MANDELBROT_VIEW = (-2.0, 1.0, -1.0, 1.0)
+JULIA_VIEW = (-2.0, 2.0, -2.0, 2.0)
+JULIA_C = complex(-0.8, 0.156)
+
+SIZES = (200, 400)
+ITERATIONS = (100, 500)
+POWERS = (2, 3)
+REPEAT = 3
+TOLERANCE = 0.10  # relative slowdown flagged as a regression
+
+# --precision values
+PRECISION_NAMES = {"float64": PRECISIONS[0], "float32": PRECISIONS[1], "auto": PRECISIONS[2]}
+
+
+def cases(fractals, sizes, iterations, powers, precisions=("float64",), engines=("pixel",)):
+    for fractal in fractals:
+        funcs = MANDELBROT_FUNCS if fractal == "mandelbrot" else JULIA_FUNCS
+        float32 = MANDELBROT_FLOAT32_KERNELS if fractal == "mandelbrot" else JULIA_FLOAT32_KERNELS
+        lanes = MANDELBROT_LANE_KERNELS if fractal == "mandelbrot" else JULIA_LANE_KERNELS
+        for func_id, name in enumerate(funcs):
+            for engine, precision, m, n, k in itertools.product(engines, precisions, powers, sizes, iterations):
+                if engine == "lanes" and (precision != "float64" or func_id not in lanes):
+                    continue
+                if precision == "float64" or func_id in float32:
+                    yield dict(
+                        fractal=fractal, func=name, func_id=func_id, m=m, n=n, k=k, precision=precision, engine=engine,
+                    )
+
+
+def runner(case, c):
+    # Zero-argument function that renders the case
+    n, k, m, func_id = case["n"], case["k"], case["m"], case["func_id"]
+    precision = PRECISION_NAMES[case.get("precision", "float64")]
+    lanes = case.get("engine", "pixel") == "lanes"
+    if case["fractal"] == "mandelbrot":
+        x_min, x_max, y_min, y_max = MANDELBROT_VIEW
+        if lanes:
+            return lambda: compute_mandelbrot_lanes(n, n, k, x_min, x_max, y_min, y_max, func_id, m)
+        return lambda: compute_mandelbrot_numba(
+            n, n, k, x_min, x_max, y_min, y_max, func_id, m, precision=precision
+        )
+    x_min, x_max, y_min, y_max = JULIA_VIEW
+    h = julia_height(n, x_min, x_max, y_min, y_max)
+    if lanes:
+        return lambda: compute_julia_lanes(h, n, k, x_min, x_max, y_min, y_max, func_id, c, m)
+    return lambda: compute_julia_numba(h, n, k, x_min, x_max, y_min, y_max, func_id, c, m, precision=precision)
+
+
+def run_case(case, c=JULIA_C, repeat=REPEAT, compiled=None):
+    # compiled holds the kernels already called in this process, whose
+    # first call does not compile any more
+    render = runner(case, c)
+    start = time.perf_counter()
+    W = render()
+    first = time.perf_counter() - start
+
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        render()
+        times.append(time.perf_counter() - start)
+    seconds = min(times)
+
+    kernel = (case["fractal"], case["func_id"], case.get("precision", "float64"), case.get("engine", "pixel"))
+    jit_seconds = None
+    if compiled is not None and kernel not in compiled:
+        compiled.add(kernel)
+        jit_seconds = max(first - seconds, 0.0)
+
+    checks = {}
+    if case.get("engine", "pixel") == "lanes":
+        reference = runner(dict(case, engine="pixel"), c)()
+        checks = dict(mismatched_pixels=int((W != reference).sum()))
+
+    iterations = int(W.sum(dtype=np.int64))
+    if case["fractal"] == "julia":
+        case = dict(case, c=repr(complex(c)))
+    return dict(
+        case,
+        jit_seconds=jit_seconds,
+        seconds=seconds,
+        pixels_per_second=W.size / seconds,
+        iterations_per_second=iterations / seconds,
+        iterations=iterations,
+        pixels=W.size,
+        **checks,
+    )
+
+
+def case_key(result):
+    return (
+        result["fractal"], result["func_id"], result["m"], result["n"], result["k"], result.get("c"),
+        result.get("precision", "float64"), result.get("engine", "pixel"),
+    )
+
+
+def compare(results, baseline, tolerance=TOLERANCE):
+    # Returns (result, baseline result, speedup, regressed) for every case
+    # present in both runs
+    previous = {case_key(r): r for r in baseline["results"]}
+    rows = []
+    for result in results:
+        base = previous.get(case_key(result))
+        if base is not None:
+            speedup = base["seconds"] / result["seconds"]
+            rows.append((result, base, speedup, speedup * (1 + tolerance) < 1))
+    return rows
+
+
+def _is_default(result):
+    return result.get("precision", "float64") == "float64" and result.get("engine", "pixel") == "pixel"
+
+
+def variant_speedups(results):
+    # (result, pixel-by-pixel float64 result, speedup) for every reduced
+    # precision or lane-batched case
+    default = {case_key(r): r for r in results if _is_default(r)}
+    rows = []
+    for result in results:
+        if not _is_default(result):
+            base = default.get(case_key(dict(result, precision="float64", engine="pixel")))
+            if base is not None:
+                rows.append((result, base, base["seconds"] / result["seconds"]))
+    return rows
+
+
+def machine():
+    return dict(
+        python=platform.python_version(),
+        numba=numba.__version__,
+        numpy=np.__version__,
+        platform=platform.platform(),
+        processor=platform.processor(),
+        threads=numba.get_num_threads(),
+        threading_layer=numba.threading_layer(),
+    )
+
+
+def _format(result):
+    jit = "" if result["jit_seconds"] is None else f", JIT {result['jit_seconds']:.2f} s"
+    precision = result.get("precision", "float64")
+    if result.get("engine", "pixel") != "pixel":
+        precision += f" {result['engine']}"
+    return (
+        f"{result['fractal']} {result['func_id']:>2} {precision} m={result['m']} n={result['n']} k={result['k']}: "
+        f"{1000 * result['seconds']:8.1f} ms, {result['pixels_per_second'] / 1e6:7.2f} Mpx/s, "
+        f"{result['iterations_per_second'] / 1e6:8.1f} Mit/s{jit}"
+        + (f", {result['mismatched_pixels']} px distintos" if "mismatched_pixels" in result else "")
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m utils.benchmark",
+        description="Mide el rendimiento de los kernels para todas las funciones y una rejilla de n, k y m.",
+    )
+    parser.add_argument("--fractal", choices=["mandelbrot", "julia"], action="append", help="Por defecto, ambos")
+    parser.add_argument("--func", type=int, action="append", help="Solo estas funciones (índices)")
+    parser.add_argument("--n", type=int, nargs="+", default=SIZES)
+    parser.add_argument("--k", type=int, nargs="+", default=ITERATIONS)
+    parser.add_argument("--m", type=int, nargs="+", default=POWERS)
+    parser.add_argument(
+        "--precision", choices=list(PRECISION_NAMES), action="append",
+        help="Por defecto, float64; se puede repetir para comparar",
+    )
+    parser.add_argument(
+        "--engine", choices=["pixel", "lanes"], action="append",
+        help="Por defecto, pixel; lanes mide los kernels vectorizados (solo float64)",
+    )
+    parser.add_argument("--c", type=complex, default=JULIA_C, help="c de Julia, p. ej. -0.8+0.156j")
+    parser.add_argument("--repeat", type=int, default=REPEAT)
+    parser.add_argument("--save", help="Guarda los resultados en este fichero JSON")
+    parser.add_argument("--baseline", help="Compara con los resultados guardados en este fichero JSON")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE, help="Ralentización relativa que cuenta como regresión")
+    args = parser.parse_args(argv)
+
+    # Read it first so a wrong path fails before the run
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    compiled = set()
+    results = []
+    precisions = args.precision or ["float64"]
+    engines = args.engine or ["pixel"]
+    for case in cases(args.fractal or ["mandelbrot", "julia"], args.n, args.k, args.m, precisions, engines):
+        if args.func and case["func_id"] not in args.func:
+            continue
+        result = run_case(case, args.c, args.repeat, compiled)
+        results.append(result)
+        print(_format(result), flush=True)
+
+    speedups = variant_speedups(results)
+    for result, base, speedup in speedups:
+        print(f"{_format(result)} (float64 {1000 * base['seconds']:.1f} ms, x{speedup:.2f})")
+    if speedups:
+        mean = np.exp(np.mean([np.log(row[2]) for row in speedups]))
+        print(f"Aceleración media frente a float64 píxel a píxel: x{mean:.2f}")
+
+    mismatched = [r for r in results if r.get("mismatched_pixels", 0) > MAX_MISMATCH * r["pixels"]]
+    for result in mismatched:
+        print(f"RECUENTOS DISTINTOS {_format(result)} (máximo {MAX_MISMATCH:.1%} de {result['pixels']} px)")
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(dict(machine=machine(), repeat=args.repeat, results=results), f, indent=1)
+        print(f"Resultados guardados en {args.save}")
+
+    regressions = 0
+    if baseline is not None:
+        rows = compare(results, baseline, args.tolerance)
+        for result, base, speedup, regressed in rows:
+            if regressed:
+                print(f"REGRESIÓN {_format(result)} (antes {1000 * base['seconds']:.1f} ms, x{speedup:.2f})")
+        regressions = sum(row[3] for row in rows)
+        if rows:
+            mean = np.exp(np.mean([np.log(row[2]) for row in rows]))
+            print(f"{len(rows)} casos comparados, aceleración media x{mean:.2f}, {regressions} regresiones")
+    if regressions or mismatched:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
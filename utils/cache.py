@@ -0,0 +1,100 @@
+import hashlib
+import json
+import os
+import tempfile
+
+import numpy as np
+
+from utils.stats import phase, record
+
+# Content-addressed disk cache for iteration arrays.
+#
+# Every render is stored as a plain .npy file named after the SHA-256 of its
+# parameters, so several Streamlit processes (or replicas sharing a volume)
+# reuse each other's results. Files are written to a temporary name and
+# renamed into place, which is atomic, and read back memory-mapped. The file
+# modification time doubles as the last access time: hits touch the file and
+# eviction removes the oldest files until the directory fits the budget.
+
+CACHE_DIR = os.environ.get(
+    "FRACTALES_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "fractales")
+)
+CACHE_BYTES = int(os.environ.get("FRACTALES_CACHE_BYTES", 2 * 1024**3))
+
+
+class RenderCache:
+    def __init__(self, directory=CACHE_DIR, max_bytes=CACHE_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    @staticmethod
+    def key(**params):
+        # repr keeps every digit of floats and complex numbers
+        text = json.dumps({name: repr(value) for name, value in params.items()}, sort_keys=True)
+        return hashlib.sha256(text.encode()).hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.directory, f"{key}.npy")
+
+    def get(self, key):
+        path = self.path(key)
+        try:
+            array = np.load(path, mmap_mode="r")
+            os.utime(path)
+        except (FileNotFoundError, ValueError, OSError):
+            return None
+        return array
+
+    def put(self, key, array):
+        if self.max_bytes <= 0:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.save(f, np.ascontiguousarray(array))
+            os.replace(tmp_path, self.path(key))
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self.evict()
+
+    def evict(self):
+        entries = []
+        total = 0
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if not entry.name.endswith(".npy"):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+
+        # Oldest first; another process may be evicting at the same time
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def get_or_compute(self, compute, **params):
+        key = self.key(**params)
+        with phase("cache"):
+            array = self.get(key)
+        record(cache_hit=array is not None)
+        if array is None:
+            with phase("compute"):
+                array = compute()
+            with phase("cache"):
+                self.put(key, array)
+        return array
+
+
+render_cache = RenderCache()
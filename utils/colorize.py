@@ -0,0 +1,109 @@
+import struct
+import zlib
+from functools import lru_cache
+
+import numpy as np
+
+# Fast output path: iteration arrays are mapped through a lookup table of the
+# selected colormap into an RGB uint8 image and encoded as PNG in memory,
+# without going through a matplotlib figure.
+
+LUT_SIZE = 256
+PNG_COMPRESSION = 3  # zlib level, higher is smaller but slower
+
+
+@lru_cache(maxsize=32)
+def colormap_lut(name, size=LUT_SIZE):
+    # (size, 3) uint8 table sampled from a matplotlib colormap
+    import matplotlib
+
+    cmap = matplotlib.colormaps[name].resampled(size)
+    return (cmap(np.arange(size))[:, :3] * 255 + 0.5).astype(np.uint8)
+
+
+def colorize(W, cmap, vmin=None, vmax=None):
+    # Normalizes W between vmin and vmax (its own range by default, like
+    # imshow) and returns the RGB image with the first row at the bottom.
+    # Integer counts are mapped with a table per count value, so the whole
+    # image is a single gather.
+    lut = colormap_lut(cmap)
+    w_min = W.min()
+    w_max = W.max()
+    vmin = w_min if vmin is None else vmin
+    vmax = w_max if vmax is None else vmax
+    span = max(vmax - vmin, 1e-12)
+
+    if np.issubdtype(W.dtype, np.integer) and w_min >= 0 and w_max < 1 << 20:
+        levels = np.arange(int(w_max) + 1, dtype=np.float64)
+        return lut[lut_index(levels, vmin, span)][W[::-1]]
+
+    return lut[lut_index(W[::-1], vmin, span)]
+
+
+def colorize_histogram(W, cmap, cdf):
+    # Histogram coloring (see histogram.py): count n gets the color at
+    # cdf[n]. Integer counts go through the CDF composed with the palette,
+    # a single gather like colorize.
+    lut = colormap_lut(cmap)
+    if np.issubdtype(W.dtype, np.integer):
+        return lut[lut_index(cdf, 0.0, 1.0)][W[::-1]]
+    return lut[lut_index(np.interp(W[::-1], np.arange(cdf.size), cdf), 0.0, 1.0)]
+
+
+def lut_index(values, vmin, span):
+    # Same binning as matplotlib colormaps: floor(x * N), clipped to N - 1
+    index = (np.asarray(values, dtype=np.float64) - vmin) * (LUT_SIZE / span)
+    return np.clip(index, 0, LUT_SIZE - 1).astype(np.intp)
+
+
+def png_chunk(kind, data):
+    chunk = kind + data
+    return struct.pack(">I", len(data)) + chunk + struct.pack(">I", zlib.crc32(chunk))
+
+
+def png_header(h, w):
+    # Signature and IHDR for 8-bit RGB
+    return b"\x89PNG\r\n\x1a\n" + png_chunk(b"IHDR", struct.pack(">IIBBBBB", w, h, 8, 2, 0, 0, 0))
+
+
+def encode_png(rgb, level=PNG_COMPRESSION):
+    # (h, w, 3) uint8 -> PNG bytes, every row with filter type 0
+    h, w, _ = rgb.shape
+    raw = np.zeros((h, 1 + 3 * w), dtype=np.uint8)
+    raw[:, 1:] = rgb.reshape(h, 3 * w)
+    return (
+        png_header(h, w)
+        + png_chunk(b"IDAT", zlib.compress(raw.tobytes(), level))
+        + png_chunk(b"IEND", b"")
+    )
+
+
+class PngWriter:
+    # Streams an 8-bit RGB PNG to a binary file a block of rows at a time,
+    # so the whole image is never in memory. Rows go from the top down.
+    def __init__(self, f, h, w, level=PNG_COMPRESSION):
+        self.f = f
+        self.w = w
+        self.rows_left = h
+        self.compressor = zlib.compressobj(level)
+        f.write(png_header(h, w))
+
+    def write_rows(self, rgb):
+        rows = rgb.shape[0]
+        if rows > self.rows_left:
+            raise ValueError("Más filas que la altura de la imagen")
+        raw = np.zeros((rows, 1 + 3 * self.w), dtype=np.uint8)
+        raw[:, 1:] = rgb.reshape(rows, 3 * self.w)
+        self._idat(self.compressor.compress(raw.tobytes()))
+        self.rows_left -= rows
+
+    def close(self):
+        if self.rows_left:
+            raise ValueError(f"Faltan {self.rows_left} filas de la imagen")
+        self._idat(self.compressor.flush())
+        self.f.write(png_chunk(b"IEND", b""))
+
+    def _idat(self, data):
+        # The compressor returns nothing until it has a block ready
+        if data:
+            self.f.write(png_chunk(b"IDAT", data))
@@ -0,0 +1,155 @@
+import math
+
+import mpmath
+import numpy as np
+from numba import jit, prange
+
+from utils.kernels import add_work, kernel_lock
+from utils.stats import count_work, new_work
+
+# Deep zoom for the z^m + c Mandelbrot set using perturbation theory.
+#
+# A single reference orbit Z_n is computed at the view center with mpmath
+# (arbitrary precision). Every pixel c = C + dc is then iterated as a float64
+# delta d_n = z_n - Z_n:
+#
+#     d_{n+1} = (Z_n + d_n)^m - Z_n^m + dc
+#
+# which only involves small numbers, so the image keeps its detail far below
+# the ~1e-13 limit of plain float64 coordinates. The first iterations are
+# skipped with a cubic series approximation d_n ~ A_n dc + B_n dc^2 + C_n dc^3
+# and glitches are avoided by rebasing to the start of the reference orbit
+# whenever |Z_n + d_n| < |d_n| (Zhuoran's method).
+
+# Relative error allowed between the series and the probe orbits. Boundary
+# pixels are chaotic, so anything looser visibly changes iteration counts.
+SERIES_TOLERANCE = 1e-9
+
+
+def reference_orbit(center_x, center_y, k, m, dps):
+    # Reference orbit of the center, rounded to complex128. Stops after the
+    # first escaped point (|Z|^2 > 4) or after k iterations.
+    with mpmath.workdps(dps):
+        C = mpmath.mpc(mpmath.mpf(center_x), mpmath.mpf(center_y))
+        Z = mpmath.mpc(0)
+        orbit = [0j]
+        for _ in range(k):
+            Z = Z**m + C
+            orbit.append(complex(Z))
+            if Z.real * Z.real + Z.imag * Z.imag > 4:
+                break
+    return np.array(orbit, dtype=np.complex128)
+
+
+@jit(nopython=True, fastmath=True, cache=True)
+def perturb(Z, d, dc, m):
+    # (Z + d)^m - Z^m + dc without cancellation, by Horner on the binomial
+    # expansion: sum_{j=1..m} binom(m, j) Z^(m-j) d^j
+    if m == 2:
+        return (2 * Z + d) * d + dc
+    p = 1.0 + 0j
+    zp = 1.0 + 0j
+    binom = 1.0
+    for j in range(m - 1, 0, -1):
+        binom = binom * (j + 1) / (m - j)
+        zp = zp * Z
+        p = p * d + binom * zp
+    return p * d + dc
+
+
+@jit(nopython=True, cache=True)
+def series_approximation(Z, m, r, probes):
+    # Cubic series for d_n with the coefficients scaled by r, r^2 and r^3
+    # (r = largest |dc| in the view) so they stay in float64 range at any zoom.
+    # The probe points (dc / r, on the view boundary) are iterated with plain
+    # perturbation alongside; iterations are skipped while the series agrees
+    # with them.
+    b2 = m * (m - 1) / 2
+    b3 = m * (m - 1) * (m - 2) / 6
+    d = np.zeros(len(probes), dtype=np.complex128)
+    A = 0j
+    B = 0j
+    C = 0j
+    skip = 0
+    for n in range(len(Z) - 1):
+        z = Z[n]
+        d1 = m * z ** (m - 1) if m > 1 else 1.0 + 0j
+        d2 = b2 * z ** (m - 2) if m > 1 else 0j
+        d3 = b3 * z ** (m - 3) if m > 2 else 0j
+        A_next = d1 * A + r
+        B_next = d1 * B + d2 * A * A
+        C_next = d1 * C + 2 * d2 * A * B + d3 * A * A * A
+        valid = True
+        for p in range(len(probes)):
+            u = probes[p]
+            d[p] = perturb(z, d[p], u * r, m)
+            approx = ((C_next * u + B_next) * u + A_next) * u
+            if abs(approx - d[p]) > SERIES_TOLERANCE * abs(d[p]):
+                valid = False
+        if not valid:
+            break
+        A, B, C = A_next, B_next, C_next
+        skip = n + 1
+    return skip, A, B, C
+
+
+@jit(nopython=True, fastmath=True, parallel=True, cache=True)
+def perturbation_kernel(h, w, k, dx, dy, Z, m, skip, A, B, C, r, work):
+    # The iterations skipped by the series approximation are not counted
+    # in `work`
+    result = np.zeros((h, w), dtype=np.int32)
+    last = len(Z) - 1
+
+    for i in prange(h):
+        dy_i = (i - h / 2) * dy
+        iterations = 0
+        at_k = 0
+        for j in range(w):
+            dc = complex((j - w / 2) * dx, dy_i)
+            u = dc / r
+            d = ((C * u + B) * u + A) * u
+            n = skip
+            ref = skip
+            while n < k:
+                z = Z[ref] + d
+                z2 = z.real * z.real + z.imag * z.imag
+                if z2 > 4.0:
+                    break
+                if ref == last or z2 < d.real * d.real + d.imag * d.imag:
+                    # Rebase onto the start of the reference orbit
+                    d = z
+                    ref = 0
+                d = perturb(Z[ref], d, dc, m)
+                ref += 1
+                n += 1
+            result[i, j] = n
+            iterations += n - skip
+            at_k += n >= k
+        add_work(work, iterations, w, at_k)
+
+    return result
+
+
+def compute_mandelbrot_deep(h, w, k, center_x, center_y, radius, m=2):
+    # center_x/center_y are decimal strings (or mpmath numbers) with as many
+    # digits as the zoom needs; radius is the half width of the view.
+    radius = float(radius)
+    dps = max(20, int(-math.log10(radius)) + 20)
+    Z = reference_orbit(center_x, center_y, k, m, dps)
+
+    dx = 2 * radius / w
+    dy = dx
+    half_w = w * dx / 2
+    half_h = h * dy / 2
+    r = math.hypot(half_w, half_h)
+    # View corners and edge midpoints
+    probes = np.array(
+        [complex(sx * half_w, sy * half_h) / r
+         for sx, sy in ((1, 1), (1, -1), (-1, 1), (-1, -1), (1, 0), (-1, 0), (0, 1), (0, -1))]
+    )
+    skip, A, B, C = series_approximation(Z, m, r, probes)
+    work = new_work()
+    with kernel_lock:
+        W = perturbation_kernel(h, w, k, dx, dy, Z, m, skip, A, B, C, r, work)
+    count_work(work)
+    return W
@@ -0,0 +1,45 @@
+# Mapping of function names to IDs for Numba
+MANDELBROT_FUNCS = [
+    "Fractal de Mandelbrot del tipo z = z^m + c",
+    "Fractal de Mandelbrot del tipo z =  z^m + 1/c",
+    "Fractal de Mandelbrot del tipo z = cos(z^m) + 1/c",
+    "Fractal de Mandelbrot del tipo z = sin(z^m) + 1/c",
+    "Fractal de Mandelbrot del tipo z = exp[(z^m - 1.00001 * z) / sqrt(c^3)]",
+    "Fractal de Mandelbrot del tipo z = exp[(z^m - 1.00001 * z) / c^3]",
+    "Fractal de Mandelbrot del tipo z = cos(z^m/c^m)",
+    "Fractal de Mandelbrot del tipo z = exp(z^m/c^m)",
+    "Fractal de Mandelbrot del tipo z = exp(c^m/z^m)",
+    "Fractal de Mandelbrot del tipo z = exp(z/c^m) + 1/c",
+    "Fractal de Mandelbrot del tipo z = cosh(z^m/c^m)",
+]
+
+JULIA_FUNCS = [
+    "Fractal de Julia del tipo z^m + c",
+    "Fractal de Julia del tipo z^m + 1/c",
+    "Fractal de Julia del tipo z = Exp(z^m/c^m)",
+]
+
+# LaTeX mappings for titles
+MANDELBROT_LATEX = {
+    "Fractal de Mandelbrot del tipo z = z^m + c": r"$z_{n+1} = z_n^m + c$",
+    "Fractal de Mandelbrot del tipo z =  z^m + 1/c": r"$z_{n+1} = z_n^m + 1/c$",
+    "Fractal de Mandelbrot del tipo z = cos(z^m) + 1/c": r"$z_{n+1} = \cos(z_n^m) + 1/c$",
+    "Fractal de Mandelbrot del tipo z = sin(z^m) + 1/c": r"$z_{n+1} = \sin(z_n^m) + 1/c$",
+    "Fractal de Mandelbrot del tipo z = exp[(z^m - 1.00001 * z) / sqrt(c^3)]": r"$z_{n+1} = \exp\left(\frac{z_n^m - 1.00001 z_n}{\sqrt{c^3}}\right)$",
+    "Fractal de Mandelbrot del tipo z = exp[(z^m - 1.00001 * z) / c^3]": r"$z_{n+1} = \exp\left(\frac{z_n^m - 1.00001 z_n}{c^3}\right)$",
+    "Fractal de Mandelbrot del tipo z = cos(z^m/c^m)": r"$z_{n+1} = \cos(z_n^m/c^m)$",
+    "Fractal de Mandelbrot del tipo z = exp(z^m/c^m)": r"$z_{n+1} = \exp(z_n^m/c^m)$",
+    "Fractal de Mandelbrot del tipo z = exp(c^m/z^m)": r"$z_{n+1} = \exp(c^m/z_n^m)$",
+    "Fractal de Mandelbrot del tipo z = exp(z/c^m) + 1/c": r"$z_{n+1} = \exp(z_n/c^m) + 1/c$",
+    "Fractal de Mandelbrot del tipo z = cosh(z^m/c^m)": r"$z_{n+1} = \cosh(z_n^m/c^m)$",
+}
+
+JULIA_LATEX = {
+    "Fractal de Julia del tipo z^m + c": r"$z_{n+1} = z_n^m + c$",
+    "Fractal de Julia del tipo z^m + 1/c": r"$z_{n+1} = z_n^m + 1/c$",
+    "Fractal de Julia del tipo z = Exp(z^m/c^m)": r"$z_{n+1} = \exp(z_n^m/c^m)$",
+}
+
+# Create dictionaries to maintain compatibility with existing main code
+function_dict = {name: i for i, name in enumerate(MANDELBROT_FUNCS)}
+funct_dict = {name: i for i, name in enumerate(JULIA_FUNCS)}
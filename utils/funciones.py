@@ -1,141 +1,210 @@
-import tempfile
+import io
+import json
 import math
 import numpy as np
-import matplotlib.pyplot as plt
 import time
+from contextlib import contextmanager
 import streamlit as st
-from numba import jit, prange
-
-# Mapping of function names to IDs for Numba
-# Mapping of function names to IDs for Numba
-MANDELBROT_FUNCS = [
-    "Fractal de Mandelbrot del tipo z = z^m + c",
-    "Fractal de Mandelbrot del tipo z =  z^m + 1/c",
-    "Fractal de Mandelbrot del tipo z = cos(z^m) + 1/c",
-    "Fractal de Mandelbrot del tipo z = sin(z^m) + 1/c",
-    "Fractal de Mandelbrot del tipo z = exp[(z^m - 1.00001 * z) / sqrt(c^3)]",
-    "Fractal de Mandelbrot del tipo z = exp[(z^m - 1.00001 * z) / c^3]",
-    "Fractal de Mandelbrot del tipo z = cos(z^m/c^m)",
-    "Fractal de Mandelbrot del tipo z = exp(z^m/c^m)",
-    "Fractal de Mandelbrot del tipo z = exp(c^m/z^m)",
-    "Fractal de Mandelbrot del tipo z = exp(z/c^m) + 1/c",
-    "Fractal de Mandelbrot del tipo z = cosh(z^m/c^m)",
-]
-
-JULIA_FUNCS = [
-    "Fractal de Julia del tipo z^m + c",
-    "Fractal de Julia del tipo z^m + 1/c",
-    "Fractal de Julia del tipo z = Exp(z^m/c^m)",
-]
-
-# LaTeX mappings for titles
-MANDELBROT_LATEX = {
-    "Fractal de Mandelbrot del tipo z = z^m + c": r"$z_{n+1} = z_n^m + c$",
-    "Fractal de Mandelbrot del tipo z =  z^m + 1/c": r"$z_{n+1} = z_n^m + 1/c$",
-    "Fractal de Mandelbrot del tipo z = cos(z^m) + 1/c": r"$z_{n+1} = \cos(z_n^m) + 1/c$",
-    "Fractal de Mandelbrot del tipo z = sin(z^m) + 1/c": r"$z_{n+1} = \sin(z_n^m) + 1/c$",
-    "Fractal de Mandelbrot del tipo z = exp[(z^m - 1.00001 * z) / sqrt(c^3)]": r"$z_{n+1} = \exp\left(\frac{z_n^m - 1.00001 z_n}{\sqrt{c^3}}\right)$",
-    "Fractal de Mandelbrot del tipo z = exp[(z^m - 1.00001 * z) / c^3]": r"$z_{n+1} = \exp\left(\frac{z_n^m - 1.00001 z_n}{c^3}\right)$",
-    "Fractal de Mandelbrot del tipo z = cos(z^m/c^m)": r"$z_{n+1} = \cos(z_n^m/c^m)$",
-    "Fractal de Mandelbrot del tipo z = exp(z^m/c^m)": r"$z_{n+1} = \exp(z_n^m/c^m)$",
-    "Fractal de Mandelbrot del tipo z = exp(c^m/z^m)": r"$z_{n+1} = \exp(c^m/z_n^m)$",
-    "Fractal de Mandelbrot del tipo z = exp(z/c^m) + 1/c": r"$z_{n+1} = \exp(z_n/c^m) + 1/c$",
-    "Fractal de Mandelbrot del tipo z = cosh(z^m/c^m)": r"$z_{n+1} = \cosh(z_n^m/c^m)$",
-}
+import streamlit.components.v1 as components
+from utils.cache import render_cache
+from utils.colorize import colorize, colorize_histogram, encode_png
+from utils.histogram import equalize
+from utils.tiles import TILE_HOST, TILE_PORT, TILE_URL, start_server, tile_url, map_html
+
+from utils.formulas import (
+    MANDELBROT_FUNCS, JULIA_FUNCS, MANDELBROT_LATEX, JULIA_LATEX, function_dict, funct_dict,
+)
+from utils.scheduling import SCHEDULES, MAX_THREADS
+from utils.precision import PRECISIONS
+from utils.distance import MANDELBROT_DISTANCE_KERNELS, JULIA_DISTANCE_KERNELS, distance_image
+from utils.render import (
+    ENGINES, mandelbrot_cache_params, julia_cache_params, julia_height, render_mandelbrot, render_julia,
+)
+from utils.warmup import start_warmup
+from utils.stats import PHASES, collect, count_escapes, current, phase, record
+
+# matplotlib and the deep zoom (mpmath) are imported where they are used:
+# together they take longer to import than the rest of the app.
+
+# Every page renders in two stages. The compute stage (st_compute_*) returns
+# the counts and is kept in memory, shared by all sessions, without copying
+# them (cache_resource); its key has no palette, title or figure options.
+# The plot stage (st_plot_*) only colorizes and encodes them, so browsing
+# palettes never reaches the kernels, nor reads the disk cache again.
+COMPUTE_CACHE_ENTRIES = 8
+
+def st_show_fractal(W, color, extent, title, annotated=False, xlabel=None, ylabel=None, cdf=None):
+    # Shows the iteration array and returns the PNG used for the download.
+    # By default the array is colorized through a lookup table and encoded
+    # directly; annotated=True draws a matplotlib figure with axes instead.
+    # With the CDF of the counts, colors follow the histogram.
+    if not annotated:
+        with phase("colorize"):
+            rgb = colorize(W, color) if cdf is None else colorize_histogram(W, color, cdf)
+        with phase("encode"):
+            img_bytes = encode_png(rgb)
+        st.markdown(title)
+        st.image(img_bytes, use_container_width=True)
+        return img_bytes
+
+    import matplotlib.pyplot as plt
 
-JULIA_LATEX = {
-    "Fractal de Julia del tipo z^m + c": r"$z_{n+1} = z_n^m + c$",
-    "Fractal de Julia del tipo z^m + 1/c": r"$z_{n+1} = z_n^m + 1/c$",
-    "Fractal de Julia del tipo z = Exp(z^m/c^m)": r"$z_{n+1} = \exp(z_n^m/c^m)$",
+    with phase("plot"):
+        if cdf is not None:
+            W = equalize(W, cdf)
+        fig, ax = plt.subplots()
+        ax.imshow(
+            W,
+            extent=extent,
+            cmap=color,
+            # Smooth (float) counts have no banding to hide
+            interpolation="nearest" if np.issubdtype(W.dtype, np.floating) else "bilinear",
+            aspect="equal",
+            origin="lower" # Matplotlib imshow origin is upper by default, but we generated from y_min to y_max
+        )
+        ax.set_title(title, fontsize=10)
+        if xlabel:
+            ax.set_xlabel(xlabel, fontsize=8)
+        if ylabel:
+            ax.set_ylabel(ylabel, fontsize=8)
+        ax.tick_params(axis="both", labelsize=8)
+        st.pyplot(fig)
+
+    buffer = io.BytesIO()
+    with phase("encode"):
+        fig.savefig(buffer, format="png", dpi=300) # Reduced DPI for speed, 1000 is overkill for web
+    plt.close(fig)
+    return buffer.getvalue()
+
+PHASE_LABELS = {
+    "cache": "Caché de disco",
+    "compile": "Compilación JIT",
+    "compute": "Cálculo",
+    "stats": "Estadísticas",
+    "histogram": "Histograma",
+    "colorize": "Coloreado",
+    "plot": "Figura (matplotlib)",
+    "encode": "Codificación PNG",
 }
 
-# Create dictionaries to maintain compatibility with existing main code
-function_dict = {name: i for i, name in enumerate(MANDELBROT_FUNCS)}
-funct_dict = {name: i for i, name in enumerate(JULIA_FUNCS)}
+def st_show_stats(stats):
+    # Expandable panel with the statistics of a render (see stats.py)
+    with st.expander("📊 Estadísticas del render"):
+        phases = stats["phases"]
+        rows = [{"Fase": PHASE_LABELS[name], "ms": round(1000 * phases[name], 1)} for name in PHASES if name in phases]
+        rows.append({"Fase": "Resto (mostrar la imagen)", "ms": round(1000 * (stats["seconds"] - sum(phases.values())), 1)})
+        rows.append({"Fase": "Total", "ms": round(1000 * stats["seconds"], 1)})
+        st.table(rows)
+        if stats.get("cache_hit"):
+            st.caption("Resultado leído de la caché: no se ha calculado nada en este render.")
 
-@jit(nopython=True, fastmath=True, parallel=True)
-def compute_mandelbrot_numba(h, w, k, x_min, x_max, y_min, y_max, func_id, m):
-    result = np.zeros((h, w), dtype=np.int32)
-    
-    dx = (x_max - x_min) / w
-    dy = (y_max - y_min) / h
-    
-    for i in prange(h):
-        y = y_min + i * dy
-        for j in range(w):
-            x = x_min + j * dx
-            c = complex(x, y)
-            z = 0.0j
-            
-            iter_count = 0
-            while iter_count < k and (z.real*z.real + z.imag*z.imag) <= 4.0:
-                if func_id == 0:
-                    z = z**m + c
-                elif func_id == 1:
-                    if c != 0: z = z**m + 1/c
-                    else: z = 0 # Handle division by zero
-                elif func_id == 2:
-                    if c != 0: z = np.cos(z**m) + 1/c
-                elif func_id == 3:
-                    if c != 0: z = np.sin(z**m) + 1/c
-                elif func_id == 4:
-                    # exp[(z^m - 1.00001 * z) / sqrt(c^3)]
-                    if c != 0:
-                        term = np.sqrt(c**3)
-                        if term != 0:
-                            z = np.exp((z**m - 1.00001 * z) / term)
-                elif func_id == 5:
-                    if c != 0: z = np.exp((z**m - 1.00001 * z) / c**3)
-                elif func_id == 6:
-                    if c != 0: z = np.cos(z**m / c**m)
-                elif func_id == 7:
-                    if c != 0: z = np.exp(z**m / c**m)
-                elif func_id == 8:
-                    if z != 0: z = np.exp(c**m / z**m)
-                elif func_id == 9:
-                    if c != 0: z = np.exp(z / c**m) + 1/c
-                elif func_id == 10:
-                    if c != 0: z = np.cosh(z**m / c**m)
-                
-                iter_count += 1
-            
-            result[i, j] = iter_count
-            
-    return result
-
-@jit(nopython=True, fastmath=True, parallel=True)
-def compute_julia_numba(h, w, k, x_min, x_max, y_min, y_max, func_id, c, m_j):
-    result = np.zeros((h, w), dtype=np.int32)
-    
-    dx = (x_max - x_min) / w
-    dy = (y_max - y_min) / h
-    
-    R = max(abs(c), 2.0)
-    R2 = R * R
-    
-    for i in prange(h):
-        y = y_min + i * dy
-        for j in range(w):
-            x = x_min + j * dx
-            z = complex(x, y)
-            
-            iter_count = 0
-            while iter_count < k and (z.real*z.real + z.imag*z.imag) <= R2:
-                if func_id == 0:
-                    z = z**m_j + c
-                elif func_id == 1:
-                    if c != 0: z = z**m_j + 1/c
-                elif func_id == 2:
-                    if c != 0: z = np.exp(z**m_j / c**m_j)
-                
-                iter_count += 1
-            
-            result[i, j] = iter_count
-            
-    return result
+        if "iterations" in stats:
+            computed = stats["computed_pixels"]
+            # Distance renders do not count the pixels of the image
+            of = f" de {stats['pixels']:,}" if "pixels" in stats else ""
+            st.markdown(
+                f"**Iteraciones calculadas:** {stats['iterations']:,} "
+                f"({stats['iterations'] / max(computed, 1):.1f} por píxel calculado) · "
+                f"**Píxeles calculados:** {computed:,}{of} · "
+                f"**Que llegan a k:** {stats['pixels_at_k']:,} · "
+                f"**Utilización de los hilos:** {100 * stats['utilization']:.1f}%"
+            )
+            st.caption("Iteraciones calculadas por cada hilo")
+            work = stats["thread_work"]
+            st.bar_chart({"hilo": list(range(len(work))), "iteraciones": work}, x="hilo", y="iteraciones")
+        if "escape_histogram" in stats:
+            histogram = stats["escape_histogram"]
+            st.caption("Píxeles de la imagen por número de iteraciones hasta escapar")
+            st.bar_chart({"iteraciones": histogram["edges"][:-1], "píxeles": histogram["counts"]}, x="iteraciones", y="píxeles")
+
+        if "evaluated_pixels" in stats:
+            evaluated, traced = stats["evaluated_pixels"], stats["traced_pixels"]
+            st.markdown(f"**Píxeles evaluados por el trazado de bordes:** {evaluated:,} de {traced:,} ({100 * evaluated / traced:.1f}%)")
+        if "antialiased_pixels" in stats:
+            refined = stats["antialiased_pixels"]
+            st.markdown(f"**Píxeles refinados por el antialiasing:** {refined:,} ({stats['antialias_samples']:,} muestras)")
+
+        st.caption("Línea JSON para la monitorización (se añade a FRACTALES_STATS_LOG si está definida):")
+        st.code(json.dumps(stats, default=str), language="json")
+
+@contextmanager
+def st_preview(progressive, color):
+    # preview callback of render_mandelbrot/render_julia, None unless
+    # progressive: shows the coarse passes of a progressive render. The slot
+    # is created and emptied here, inside the cached compute stage, so that
+    # replaying a cached call only writes to elements of its own.
+    if not progressive:
+        yield None
+        return
+    placeholder = st.empty()
+
+    def show(stride, W):
+        with phase("colorize"):
+            rgb = colorize(W, color)
+        with phase("encode"):
+            png = encode_png(rgb)
+        placeholder.image(png, caption=f"Vista previa 1/{stride}", use_container_width=True)
+
+    try:
+        yield show
+    finally:
+        placeholder.empty()
+
+@st.cache_resource
+def st_tile_server():
+    # One tile server per Streamlit process, shared by every session. If the
+    # port is taken, another process of the app is already serving tiles.
+    try:
+        return start_server(TILE_HOST, TILE_PORT)
+    except OSError:
+        return None
+
+def st_tile_map(fractal, func_id, m, k, color, c=None, smooth=False, height=600):
+    # Pan/zoom map that only computes the tiles in view
+    st_tile_server()
+    base = TILE_URL or f"http://{TILE_HOST}:{TILE_PORT}"
+    components.html(map_html(tile_url(base, fractal, func_id, m, k, color, c, smooth), height), height=height + 10)
+
+IMAGE_COUNTERS = ("pixels", "escape_histogram")
+
+def _computed(W, cdf=None):
+    # Compute stage result: the arrays, read-only as they are shared, and the
+    # counters that describe the image (not the work, which is only done the
+    # first time)
+    for array in (W, cdf):
+        if array is not None and array.flags.writeable:
+            array.flags.writeable = False
+    stats = current()
+    counters = stats.counters if stats is not None else {}
+    return W, cdf, {name: counters[name] for name in IMAGE_COUNTERS if name in counters}
+
+def _record_image(counters):
+    # Image counters of the compute stage; when its result came from memory
+    # nothing was computed or read from disk in this render
+    record(**counters)
+    stats = current()
+    if stats is not None and "cache_hit" not in stats.counters:
+        record(cache_hit=True)
+
+@st.cache_resource(max_entries=COMPUTE_CACHE_ENTRIES)
+def st_compute_mandelbrot(n, k, x_min, x_max, y_min, y_max, func_id, m, fast_interior, engine, smooth, schedule, threads, precision, symmetric, distance, antialias, histogram, _progressive=False, _color=None):
+    # Counts (or distance values) of st_plot_mandelbrot, their CDF when
+    # histogram and the stats counters. With _progressive the previews are
+    # shown in the _color palette; neither is hashed, they do not change the
+    # result.
+    with st_preview(_progressive, _color) as preview:
+        result = render_mandelbrot(
+            n, k, x_min, x_max, y_min, y_max, func_id, m, fast_interior, engine, smooth, schedule=schedule, threads=threads,
+            precision=precision, symmetric=symmetric, distance=distance, antialias=antialias, histogram=histogram,
+            preview=preview,
+        )
+    W, cdf = result if histogram else (result, None)
+    if distance and func_id in MANDELBROT_DISTANCE_KERNELS:
+        W = distance_image(W, (x_max - x_min) / n)
+    return _computed(W, cdf)
 
 @st.cache_data()
-def st_plot_mandelbrot(n, k, Xr, Yr, color, selected_func, m):
+def st_plot_mandelbrot(n, k, Xr, Yr, color, selected_func, m, fast_interior=False, engine=ENGINES[0], annotated=False, smooth=False, schedule=SCHEDULES[0], threads=None, precision=PRECISIONS[0], symmetric=True, distance=False, antialias=False, histogram=False, progressive=False):
     start_time = time.time()
     
     # Get ID from the dict (which now maps to ints) or handle if it's still using old dict
@@ -146,35 +215,24 @@ def st_plot_mandelbrot(n, k, Xr, Yr, color, selected_func, m):
     x_min, x_max = float(Xr[0]), float(Xr[1])
     y_min, y_max = float(Yr[0]), float(Yr[1])
     
-    # Compute
-    # Note: n is used for both width and height in the original code? 
-    # Original: x = np.linspace(Xr[0], Xr[1], n), y = np.linspace(Yr[0], Yr[1], n)
-    # So it's n x n
-    W = compute_mandelbrot_numba(n, n, k, x_min, x_max, y_min, y_max, func_id, m)
-    
-    # Plotting
-    fig, ax = plt.subplots()
-    ax.imshow(
-        W,
-        extent=[x_min, x_max, y_min, y_max],
-        cmap=color,
-        interpolation="bilinear",
-        aspect="equal",
-        origin="lower" # Matplotlib imshow origin is upper by default, but we generated from y_min to y_max
-    )
-    
-    # Use LaTeX title if available
-    title_str = MANDELBROT_LATEX.get(selected_func, selected_func)
-    ax.set_title(f"{title_str}, m={m}, n={n}, k={k}", fontsize=10)
-    ax.tick_params(axis="both", labelsize=8)
-    st.pyplot(fig)
+    with collect(
+        kind="mandelbrot", formula=selected_func, m=m, n=n, k=k, x=[x_min, x_max], y=[y_min, y_max], engine=engine,
+        schedule=schedule, threads=threads, precision=precision, smooth=smooth, distance=distance, antialias=antialias,
+        histogram=histogram,
+    ) as stats:
+        W, cdf, counters = st_compute_mandelbrot(
+            n, k, x_min, x_max, y_min, y_max, func_id, m, fast_interior, engine, smooth, schedule, threads, precision,
+            symmetric, distance, antialias, histogram, progressive, color,
+        )
+        _record_image(counters)
 
-    filename = f"img/{selected_func}_m{m}_n{n}_k{k}.png"
+        # Use LaTeX title if available
+        title_str = MANDELBROT_LATEX.get(selected_func, selected_func)
+        img_bytes = st_show_fractal(
+            W, color, [x_min, x_max, y_min, y_max], f"{title_str}, m={m}, n={n}, k={k}", annotated, cdf=cdf
+        )
 
-    with tempfile.NamedTemporaryFile(suffix=".png") as tmpfile:
-        plt.savefig(tmpfile.name, format="png", dpi=300) # Reduced DPI for speed, 1000 is overkill for web
-        tmpfile.seek(0)
-        img_bytes = tmpfile.read()
+    filename = f"img/{selected_func}_m{m}_n{n}_k{k}.png"
 
     end_time = time.time()
     execution_time = end_time - start_time
@@ -188,10 +246,64 @@ def st_plot_mandelbrot(n, k, Xr, Yr, color, selected_func, m):
     )
     print(f"Execution time: {time_str}")
 
-    return img_bytes, filename, execution_time
+    return img_bytes, filename, execution_time, stats.to_dict()
+
+@st.cache_resource(max_entries=COMPUTE_CACHE_ENTRIES)
+def st_compute_mandelbrot_deep(n, k, center_x, center_y, zoom, m):
+    from utils.deep_zoom import compute_mandelbrot_deep
+
+    radius = 10.0 ** -zoom
+    W = render_cache.get_or_compute(
+        lambda: compute_mandelbrot_deep(n, n, k, center_x, center_y, radius, m),
+        kind="mandelbrot_deep", m=m, k=k, n=n, center=(center_x, center_y), zoom=zoom,
+    )
+    count_escapes(W, k)
+    return _computed(W)
+
+@st.cache_data()
+def st_plot_mandelbrot_deep(n, k, center_x, center_y, zoom, color, m, annotated=False):
+    # Deep zoom of z^m + c around (center_x, center_y) with a half width of
+    # 10^-zoom. The center is kept as a string to preserve all its digits.
+    start_time = time.time()
+
+    with collect(kind="mandelbrot_deep", m=m, n=n, k=k, center=[center_x, center_y], zoom=zoom) as stats:
+        W, _, counters = st_compute_mandelbrot_deep(n, k, center_x, center_y, zoom, m)
+        _record_image(counters)
+
+        # Axes are relative to the center in units of the radius, float64 ticks
+        # cannot resolve the absolute coordinates at these depths
+        title_str = MANDELBROT_LATEX[MANDELBROT_FUNCS[0]]
+        img_bytes = st_show_fractal(
+            W, color, [-1.0, 1.0, -1.0, 1.0],
+            f"{title_str}, m={m}, zoom=1e-{zoom:g}, n={n}, k={k}", annotated,
+            xlabel=f"(x - {center_x[:12]}) / 1e-{zoom:g}",
+            ylabel=f"(y - {center_y[:12]}) / 1e-{zoom:g}",
+        )
+
+    filename = f"img/mandelbrot_deep_m{m}_zoom{zoom:g}_n{n}_k{k}.png"
+
+    execution_time = time.time() - start_time
+    print(f"Execution time: {round(execution_time, 2)} seconds")
+
+    return img_bytes, filename, execution_time, stats.to_dict()
+
+@st.cache_resource(max_entries=COMPUTE_CACHE_ENTRIES)
+def st_compute_julia(n, k, x_min, x_max, y_min, y_max, func_id, c_real, c_imag, m_j, fast_interior, engine, smooth, schedule, threads, precision, symmetric, distance, antialias, histogram, _progressive=False, _color=None):
+    # Streamlit cannot hash complex numbers
+    c = complex(c_real, c_imag)
+    with st_preview(_progressive, _color) as preview:
+        result = render_julia(
+            n, k, x_min, x_max, y_min, y_max, func_id, c, m_j, fast_interior, engine, smooth, schedule=schedule, threads=threads,
+            precision=precision, symmetric=symmetric, distance=distance, antialias=antialias, histogram=histogram,
+            preview=preview,
+        )
+    W, cdf = result if histogram else (result, None)
+    if distance and func_id in JULIA_DISTANCE_KERNELS:
+        W = distance_image(W, (x_max - x_min) / n)
+    return _computed(W, cdf)
 
 @st.cache_data()
-def st_plot_julia(n, c_real, c_imag, k, Xr, Yr, color, selected_funct, m_j):
+def st_plot_julia(n, c_real, c_imag, k, Xr, Yr, color, selected_funct, m_j, fast_interior=False, engine=ENGINES[0], annotated=False, smooth=False, schedule=SCHEDULES[0], threads=None, precision=PRECISIONS[0], symmetric=True, distance=False, antialias=False, histogram=False, progressive=False):
     start_time_j = time.time()
     
     func_id = funct_dict.get(selected_funct, 0)
@@ -200,38 +312,24 @@ def st_plot_julia(n, c_real, c_imag, k, Xr, Yr, color, selected_funct, m_j):
     x_min, x_max = float(Xr[0]), float(Xr[1])
     y_min, y_max = float(Yr[0]), float(Yr[1])
     
-    # Original logic for height: int(n * (Yr[1] - Yr[0]) / (Xr[1] - Xr[0]))
-    h = int(n * (y_max - y_min) / (x_max - x_min))
-    w = n
-    
-    W = compute_julia_numba(h, w, k, x_min, x_max, y_min, y_max, func_id, c, m_j)
-
-    fig = plt.figure()
-    plt.imshow(
-        W,
-        extent=[x_min, x_max, y_min, y_max],
-        cmap=color,
-        interpolation="bilinear",
-        aspect="equal",
-        origin="lower"
-    )
-    
-    # Use LaTeX title if available
-    title_str = JULIA_LATEX.get(selected_funct, selected_funct)
-    plt.title(
-        f"{title_str}, m={m_j}, c={c:.2f}, n={n}, k={k}",
-        fontsize=10,
-    )
-    plt.xticks(fontsize=8)
-    plt.yticks(fontsize=8)
-    st.pyplot(fig)
+    with collect(
+        kind="julia", formula=selected_funct, m=m_j, c=c, n=n, k=k, x=[x_min, x_max], y=[y_min, y_max], engine=engine,
+        schedule=schedule, threads=threads, precision=precision, smooth=smooth, distance=distance, antialias=antialias,
+        histogram=histogram,
+    ) as stats:
+        W, cdf, counters = st_compute_julia(
+            n, k, x_min, x_max, y_min, y_max, func_id, c_real, c_imag, m_j, fast_interior, engine, smooth, schedule, threads,
+            precision, symmetric, distance, antialias, histogram, progressive, color,
+        )
+        _record_image(counters)
 
-    filename_j = f"img/julia_{selected_funct}_m{m_j}_c{c}_n{n}_k{k}.png"
+        # Use LaTeX title if available
+        title_str = JULIA_LATEX.get(selected_funct, selected_funct)
+        img_bytes = st_show_fractal(
+            W, color, [x_min, x_max, y_min, y_max], f"{title_str}, m={m_j}, c={c:.2f}, n={n}, k={k}", annotated, cdf=cdf
+        )
 
-    with tempfile.NamedTemporaryFile(suffix=".png") as tmpfile:
-        plt.savefig(tmpfile.name, format="png", dpi=300)
-        tmpfile.seek(0)
-        img_bytes = tmpfile.read()
+    filename_j = f"img/julia_{selected_funct}_m{m_j}_c{c}_n{n}_k{k}.png"
 
     end_time = time.time()
     execution_time_j = end_time - start_time_j
@@ -245,4 +343,4 @@ def st_plot_julia(n, c_real, c_imag, k, Xr, Yr, color, selected_funct, m_j):
     )
     print(f"Tiempo de ejecución: {time_str}")
 
-    return img_bytes, filename_j, execution_time_j
+    return img_bytes, filename_j, execution_time_j, stats.to_dict()
@@ -0,0 +1,57 @@
+import numba
+import numpy as np
+from numba import jit, prange
+
+from utils.kernels import kernel_lock
+
+# Histogram coloring.
+#
+# Mapping the counts linearly onto the palette gives most of it to the few
+# counts near k, so a handful of slow pixels squeezes the rest of the image
+# into a couple of colors. Instead, count n gets the color at the fraction
+# of the escaping pixels that escaped after n iterations or fewer (the CDF
+# of the histogram), so every color covers about as many pixels whatever k
+# is. The pixels that reach k (inside the set) get the end of the palette,
+# as with the linear mapping.
+#
+# The histogram is built from the finished count array in one parallel pass:
+# every thread fills a partial histogram of its own block of rows, with no
+# shared writes, and they are added at the end. The kernels themselves do
+# not see every pixel (symmetry mirrors half of them and border tracing
+# fills whole rectangles), so the array is the only place with all counts.
+# The CDF has k + 1 values and is cached next to the render (see render.py),
+# so changing the palette only repeats the final lookup.
+
+
+@jit(nopython=True, fastmath=True, parallel=True, cache=True)
+def iteration_histogram(W, k, blocks):
+    # Pixels with each count 0..k; fractional counts (smooth coloring,
+    # antialiasing) are truncated and everything is clipped to [0, k]
+    h, w = W.shape
+    partial = np.zeros((blocks, k + 1), dtype=np.int64)
+    for b in prange(blocks):
+        for i in range(b * h // blocks, (b + 1) * h // blocks):
+            for j in range(w):
+                n = min(max(int(W[i, j]), 0), k)
+                partial[b, n] += 1
+    return partial.sum(axis=0)
+
+
+def iteration_cdf(W, k):
+    # (k + 1,) float64: cdf[n] is the fraction of the escaping pixels with a
+    # count of n or less, and cdf[k] = 1
+    with kernel_lock:
+        hist = iteration_histogram(np.asarray(W), k, numba.get_num_threads())
+    cdf = np.ones(k + 1)
+    escaped = np.cumsum(hist[:-1])
+    if escaped.size and escaped[-1]:
+        cdf[:-1] = escaped / escaped[-1]
+    return cdf
+
+
+def equalize(W, cdf):
+    # W mapped through the CDF, between 0 and 1; fractional counts
+    # interpolate it
+    if np.issubdtype(W.dtype, np.integer):
+        return cdf[W]
+    return np.interp(W, np.arange(cdf.size), cdf)
@@ -0,0 +1,136 @@
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import numpy as np
+
+from utils.kernels import (
+    MANDELBROT_STATE_KERNELS,
+    JULIA_STATE_KERNELS,
+    kernel_lock,
+    pixel_grid,
+    smooth_from_state,
+)
+from utils.stats import count_work, new_work
+
+# Incremental deepening: raising k on the same view continues the orbits that
+# had not escaped yet instead of restarting every pixel from scratch.
+#
+# The final z and iteration count of every pixel are kept per view (formula,
+# m, c, ranges and size; everything but k). A request with a higher k
+# advances the stored orbits, and one with a lower or equal k is answered by
+# clipping the stored counts. Both give the same counts as a fresh render.
+#
+# Renders of different views run concurrently; only renders of the same
+# view wait for each other, as they continue the same state. The states are
+# kept while they fit both limits, least recently used first out; a state
+# larger than the byte limit is not kept at all.
+
+MAX_RENDER_STATES = 2
+# z is complex128 and the counts int32, 500 MB per state at n = 5000
+MAX_RENDER_STATE_BYTES = int(os.environ.get("FRACTALES_RENDER_STATE_BYTES", 512 * 1024**2))
+
+
+class RenderState:
+    def __init__(self, Z, N, k):
+        self.Z = Z  # final z per pixel
+        self.N = N  # iteration count per pixel
+        self.k = k  # iteration limit the state was advanced to
+
+    @property
+    def nbytes(self):
+        return self.Z.nbytes + self.N.nbytes
+
+
+class IncrementalRenderer:
+    def __init__(self, max_states=MAX_RENDER_STATES, max_bytes=MAX_RENDER_STATE_BYTES):
+        self.max_states = max_states
+        self.max_bytes = max_bytes
+        self._states = OrderedDict()
+        self._nbytes = 0
+        # key -> [lock, renders using it], while any render of that view runs
+        self._views = {}
+        # Guards _states, _nbytes and _views; never held while computing
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def _view_lock(self, key):
+        with self._lock:
+            view = self._views.setdefault(key, [threading.Lock(), 0])
+            view[1] += 1
+        try:
+            with view[0]:
+                yield
+        finally:
+            with self._lock:
+                view[1] -= 1
+                if not view[1]:
+                    del self._views[key]
+
+    def _take(self, key):
+        with self._lock:
+            state = self._states.pop(key, None)
+            if state is not None:
+                self._nbytes -= state.nbytes
+        return state
+
+    def _store(self, key, state):
+        with self._lock:
+            if state.nbytes > self.max_bytes:
+                return
+            self._states[key] = state
+            self._nbytes += state.nbytes
+            while len(self._states) > self.max_states or self._nbytes > self.max_bytes:
+                _, evicted = self._states.popitem(last=False)
+                self._nbytes -= evicted.nbytes
+
+    def _render(self, key, k, initial, advance, smooth):
+        # initial(), advance(Z, N, k, work) and smooth(Z, N, k), which turns
+        # the state into normalized counts (or is None), run parallel kernels
+        with self._view_lock(key):
+            state = self._take(key)
+            if state is None:
+                with kernel_lock:
+                    Z = initial()
+                state = RenderState(Z, np.zeros(Z.shape, dtype=np.int32), 0)
+            # Stays at zero when the stored counts answer the request
+            work = new_work()
+            if k > state.k:
+                with kernel_lock:
+                    advance(state.Z, state.N, k, work)
+                state.k = k
+                W = state.N.copy()
+            else:
+                W = np.minimum(state.N, k)
+            if smooth is not None:
+                with kernel_lock:
+                    W = smooth(state.Z, W, k)
+            count_work(work)
+            self._store(key, state)
+        return W
+
+    def mandelbrot(self, h, w, k, x_min, x_max, y_min, y_max, func_id, m, fast_interior=False, smooth=False):
+        kernel = MANDELBROT_STATE_KERNELS[func_id]
+        key = ("mandelbrot", h, w, x_min, x_max, y_min, y_max, func_id, m, fast_interior)
+        return self._render(
+            key, k,
+            lambda: np.zeros((h, w), dtype=np.complex128),
+            lambda Z, N, k, work: kernel(Z, N, k, x_min, x_max, y_min, y_max, m, fast_interior, work),
+            (lambda Z, N, k: smooth_from_state(Z, N, k, m, 4.0)) if smooth else None,
+        )
+
+    def julia(self, h, w, k, x_min, x_max, y_min, y_max, func_id, c, m_j, fast_interior=False, smooth=False):
+        c = complex(c)
+        R = max(abs(c), 2.0)
+        kernel = JULIA_STATE_KERNELS[func_id]
+        key = ("julia", h, w, x_min, x_max, y_min, y_max, func_id, c, m_j, fast_interior)
+        return self._render(
+            key, k,
+            lambda: pixel_grid(h, w, x_min, x_max, y_min, y_max),
+            lambda Z, N, k, work: kernel(Z, N, k, c, m_j, fast_interior, work),
+            (lambda Z, N, k: smooth_from_state(Z, N, k, m_j, R * R)) if smooth else None,
+        )
+
+
+incremental = IncrementalRenderer()
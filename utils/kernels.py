@@ -0,0 +1,548 @@
+import functools
+import hashlib
+import os
+import threading
+
+import numba
+import numpy as np
+from numba import jit, prange, types
+from numba.core import caching
+from numba.extending import overload
+
+# Registry of specialized escape-time kernels.
+#
+# Each formula is described by a pair of Numba functions:
+#   - prepare(c, m) -> (a, b, valid): per-pixel invariants hoisted out of the
+#     escape loop (1/c, c^m, sqrt(c^3), ...). When ``valid`` is False the
+#     original code left z untouched (division by zero guards).
+#   - step(z, c, m, a, b) -> z: one iteration of the formula.
+# A kernel is compiled per formula so the escape loop carries no func_id
+# dispatch. Hoisting the invariants and replacing cpow changes how the
+# iterations round, so the counts are the ones of the original kernel up to
+# rounding: pixels on a bailout tie or on a chaotic boundary can change
+# (2 of 90,000 at n=300, k=200 for m=2, more for other m).
+#
+# Everything is compiled with cache=True, so only the first process on a
+# machine pays the compilation. Numba cannot cache a closure over another
+# jitted function (it is pickled with a random id), so the factories close
+# over the formula index f instead and reach the per-formula functions
+# through by_formula stubs, which resolve f at compile time.
+#
+# Numba checks a cached kernel against the source of the file that defines
+# it only, but the kernels of tiling, progressive, scheduling, lanes,
+# antialias and distance inline code from this module (and progressive and
+# scheduling from tiling too). The cache locators below, tried before
+# Numba's own, add the source of both modules to the stamp of every kernel
+# of the package, so editing either one recompiles the kernels built on it.
+# They are inserted into a private list of Numba's, so only on the versions
+# they were checked against; elsewhere Numba's own locators are used and a
+# stale kernel has to be cleared by hand (see the README).
+
+INLINED_SOURCES = [os.path.join(os.path.dirname(os.path.abspath(__file__)), name)
+                   for name in ("kernels.py", "tiling.py")]
+LOCATOR_NUMBA_VERSIONS = ((0, 62), (0, 68))  # first and last (major, minor)
+
+
+@functools.lru_cache(maxsize=None)
+def _source_hash(path, mtime, size):
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+class _PackageLocator:
+    @classmethod
+    def from_function(cls, py_func, py_file):
+        if os.path.dirname(os.path.abspath(py_file)) != os.path.dirname(INLINED_SOURCES[0]):
+            return None
+        return super().from_function(py_func, py_file)
+
+    def get_source_stamp(self):
+        stamps = [super().get_source_stamp()]
+        for path in INLINED_SOURCES:
+            st = os.stat(path)
+            stamps.append(_source_hash(path, st.st_mtime, st.st_size))
+        return tuple(stamps)
+
+
+class _InTreeLocator(_PackageLocator, caching.InTreeCacheLocator):
+    pass
+
+
+class _UserWideLocator(_PackageLocator, caching.UserWideCacheLocator):
+    pass
+
+
+if (hasattr(caching.CacheImpl, "_locator_classes")
+        and LOCATOR_NUMBA_VERSIONS[0] <= numba.version_info.short <= LOCATOR_NUMBA_VERSIONS[1]):
+    caching.CacheImpl._locator_classes[:0] = [_InTreeLocator, _UserWideLocator]
+
+
+def by_formula(functions):
+    # Returns call(f, *args), usable from jitted code with a constant f,
+    # that compiles to a direct call to functions[f](*args). The list may
+    # be filled after the stub is created.
+    def call(f, *args):
+        raise NotImplementedError("only callable from jitted code")
+
+    @overload(call, prefer_literal=True)
+    def _call(f, *args):
+        if isinstance(f, types.IntegerLiteral):
+            impl = functions[f.literal_value]
+            return lambda f, *args: impl(*args)
+
+    return call
+
+
+# Same for the prepare and step functions of FORMULAS, with fixed arguments
+# so they can be inlined into the escape loop (*args calls cannot).
+
+def formula_prepare(f, c, m):
+    raise NotImplementedError("only callable from jitted code")
+
+
+def formula_step(f, z, c, m, a, b):
+    raise NotImplementedError("only callable from jitted code")
+
+
+@overload(formula_prepare, prefer_literal=True, inline="always")
+def _formula_prepare(f, c, m):
+    if isinstance(f, types.IntegerLiteral):
+        prepare = FORMULAS[f.literal_value][0]
+        return lambda f, c, m: prepare(c, m)
+
+
+@overload(formula_step, prefer_literal=True, inline="always")
+def _formula_step(f, z, c, m, a, b):
+    if isinstance(f, types.IntegerLiteral):
+        step = FORMULAS[f.literal_value][1]
+        return lambda f, z, c, m, a, b: step(z, c, m, a, b)
+
+
+@jit(nopython=True, fastmath=True, cache=True)
+def ipow(z, m):
+    # Integer powers by repeated squaring instead of the complex cpow call.
+    # m == 2 lowers to z * z like Numba does for z**2, and is kept as a
+    # regular (not IR-inlined) call, but with fastmath LLVM is still free to
+    # contract the escape loop differently: the counts match the original
+    # dispatching kernel up to rounding, a few boundary pixels apart.
+    if m == 2:
+        return z * z
+    if m < 1 or m > 64:
+        return z**m
+    r = z
+    m -= 1
+    p = z
+    while m > 0:
+        if m & 1:
+            r = r * p
+        m >>= 1
+        if m > 0:
+            p = p * p
+    return r
+
+
+# --- Invariants -------------------------------------------------------------
+
+@jit(nopython=True, fastmath=True, inline="always", cache=True)
+def _prep_none(c, m):
+    return 0j, 0j, True
+
+
+@jit(nopython=True, fastmath=True, inline="always", cache=True)
+def _prep_inv_c(c, m):
+    if c != 0:
+        return 1 / c, 0j, True
+    return 0j, 0j, False
+
+
+@jit(nopython=True, fastmath=True, inline="always", cache=True)
+def _prep_sqrt_c3(c, m):
+    if c != 0:
+        term = np.sqrt(c**3)
+        if term != 0:
+            return term, 0j, True
+    return 0j, 0j, False
+
+
+@jit(nopython=True, fastmath=True, inline="always", cache=True)
+def _prep_c3(c, m):
+    if c != 0:
+        return c**3, 0j, True
+    return 0j, 0j, False
+
+
+@jit(nopython=True, fastmath=True, inline="always", cache=True)
+def _prep_cm(c, m):
+    if c != 0:
+        return c**m, 0j, True
+    return 0j, 0j, False
+
+
+@jit(nopython=True, fastmath=True, inline="always", cache=True)
+def _prep_cm_always(c, m):
+    return c**m, 0j, True
+
+
+@jit(nopython=True, fastmath=True, inline="always", cache=True)
+def _prep_cm_inv_c(c, m):
+    if c != 0:
+        return c**m, 1 / c, True
+    return 0j, 0j, False
+
+
+# --- Steps ------------------------------------------------------------------
+
+@jit(nopython=True, fastmath=True, inline="always", cache=True)
+def _step_zm_plus_c(z, c, m, a, b):
+    return ipow(z, m) + c
+
+
+@jit(nopython=True, fastmath=True, inline="always", cache=True)
+def _step_zm_plus_a(z, c, m, a, b):
+    return ipow(z, m) + a
+
+
+@jit(nopython=True, fastmath=True, inline="always", cache=True)
+def _step_cos_zm_plus_a(z, c, m, a, b):
+    return np.cos(ipow(z, m)) + a
+
+
+@jit(nopython=True, fastmath=True, inline="always", cache=True)
+def _step_sin_zm_plus_a(z, c, m, a, b):
+    return np.sin(ipow(z, m)) + a
+
+
+@jit(nopython=True, fastmath=True, inline="always", cache=True)
+def _step_exp_zm_minus_z_over_a(z, c, m, a, b):
+    return np.exp((ipow(z, m) - 1.00001 * z) / a)
+
+
+@jit(nopython=True, fastmath=True, inline="always", cache=True)
+def _step_cos_zm_over_a(z, c, m, a, b):
+    return np.cos(ipow(z, m) / a)
+
+
+@jit(nopython=True, fastmath=True, inline="always", cache=True)
+def _step_exp_zm_over_a(z, c, m, a, b):
+    return np.exp(ipow(z, m) / a)
+
+
+@jit(nopython=True, fastmath=True, inline="always", cache=True)
+def _step_exp_a_over_zm(z, c, m, a, b):
+    if z != 0:
+        return np.exp(a / ipow(z, m))
+    return z
+
+
+@jit(nopython=True, fastmath=True, inline="always", cache=True)
+def _step_exp_z_over_a_plus_b(z, c, m, a, b):
+    return np.exp(z / a) + b
+
+
+@jit(nopython=True, fastmath=True, inline="always", cache=True)
+def _step_cosh_zm_over_a(z, c, m, a, b):
+    return np.cosh(ipow(z, m) / a)
+
+
+# One entry per MANDELBROT_FUNCS, in the same order.
+FORMULAS = [
+    (_prep_none, _step_zm_plus_c),  # z^m + c
+    (_prep_inv_c, _step_zm_plus_a),  # z^m + 1/c
+    (_prep_inv_c, _step_cos_zm_plus_a),  # cos(z^m) + 1/c
+    (_prep_inv_c, _step_sin_zm_plus_a),  # sin(z^m) + 1/c
+    (_prep_sqrt_c3, _step_exp_zm_minus_z_over_a),  # exp[(z^m - 1.00001 z) / sqrt(c^3)]
+    (_prep_c3, _step_exp_zm_minus_z_over_a),  # exp[(z^m - 1.00001 z) / c^3]
+    (_prep_cm, _step_cos_zm_over_a),  # cos(z^m / c^m)
+    (_prep_cm, _step_exp_zm_over_a),  # exp(z^m / c^m)
+    (_prep_cm_always, _step_exp_a_over_zm),  # exp(c^m / z^m)
+    (_prep_cm_inv_c, _step_exp_z_over_a_plus_b),  # exp(z / c^m) + 1/c
+    (_prep_cm, _step_cosh_zm_over_a),  # cosh(z^m / c^m)
+]
+
+# JULIA_FUNCS reuse the Mandelbrot formulas: z^m + c, z^m + 1/c, exp(z^m/c^m)
+JULIA_FORMULAS = [0, 1, 7]
+
+def make_iterate(f):
+    # Runs the orbit of z from iteration n up to k (or until |z|^2 > bailout2)
+    # and returns the final iteration count, z and the steps actually run.
+    @jit(nopython=True, fastmath=True, cache=True)
+    def iterate(z, c, n, k, m, bailout2):
+        a, b, valid = formula_prepare(f, c, m)
+        if not valid:
+            # z stays constant: either it never escapes or it already has
+            if n < k and z.real * z.real + z.imag * z.imag <= bailout2:
+                n = k
+            return n, z, 0
+        start = n
+        while n < k and z.real * z.real + z.imag * z.imag <= bailout2:
+            z = formula_step(f, z, c, m, a, b)
+            n += 1
+        return n, z, n - start
+
+    return iterate
+
+
+def make_iterate_periodic(f):
+    # Same as make_iterate but with Brent-style cycle detection: z is
+    # compared against a snapshot refreshed at power-of-two intervals. The
+    # comparison is exact, so a hit means the floating point orbit really
+    # is periodic and would have run until k anyway.
+    @jit(nopython=True, fastmath=True, cache=True)
+    def iterate(z, c, n, k, m, bailout2):
+        a, b, valid = formula_prepare(f, c, m)
+        if not valid:
+            if n < k and z.real * z.real + z.imag * z.imag <= bailout2:
+                n = k
+            return n, z, 0
+        start = n
+        saved = z
+        steps = 0
+        limit = 8
+        while n < k and z.real * z.real + z.imag * z.imag <= bailout2:
+            z = formula_step(f, z, c, m, a, b)
+            n += 1
+            if z == saved:
+                return k, z, n - start
+            steps += 1
+            if steps == limit:
+                steps = 0
+                limit *= 2
+                saved = z
+        return n, z, n - start
+
+    return iterate
+
+
+MANDELBROT_ITERATE = [make_iterate(f) for f in range(len(FORMULAS))]
+MANDELBROT_ITERATE_PERIODIC = [make_iterate_periodic(f) for f in range(len(FORMULAS))]
+ITERATE = by_formula(MANDELBROT_ITERATE)
+ITERATE_PERIODIC = by_formula(MANDELBROT_ITERATE_PERIODIC)
+
+
+@jit(nopython=True, fastmath=True, cache=True)
+def in_cardioid_or_bulb(x, y):
+    # Main cardioid and period-2 bulb of z^2 + c
+    xq = x - 0.25
+    q = xq * xq + y * y
+    if q * (q + xq) <= 0.25 * y * y:
+        return True
+    xb = x + 1.0
+    return xb * xb + y * y <= 0.0625
+
+
+# Numba's workqueue threading layer (the one used when neither TBB nor
+# OpenMP is installed) aborts the process when two threads launch parallel
+# kernels at once, and the app launches them from every Streamlit session
+# and from the tile server threads. Every parallel kernel is called under
+# this lock; each one already uses all the cores.
+kernel_lock = threading.Lock()
+
+
+@jit(nopython=True, inline="always", cache=True)
+def add_work(work, iterations, pixels, at_k):
+    # Adds to the calling thread's row of a work array (see stats.new_work):
+    # iterations run, pixels computed and how many of those reached k.
+    # Inlined: the thread id only resolves inside a parallel kernel.
+    t = numba.get_thread_id()
+    work[t, 0] += iterations
+    work[t, 1] += pixels
+    work[t, 2] += at_k
+
+
+@jit(nopython=True, cache=True)
+def smooth_count(n, z, k, m, bailout2):
+    # Normalized (continuous) iteration count from the escaped z:
+    #     n + 1 - log(log|z| / log R) / log m
+    # with R the bailout radius. Not fastmath: it has to see infinities.
+    if n >= k or m < 2:
+        return float(n)
+    r2 = z.real * z.real + z.imag * z.imag
+    nu = n + 1 - np.log(np.log(r2) / np.log(bailout2)) / np.log(m)
+    if not np.isfinite(nu):
+        return float(n)
+    return min(max(nu, 0.0), float(k))
+
+
+def make_mandelbrot_kernel(f, has_bulbs, smooth=False):
+    # smooth=True returns float32 normalized counts instead of int32 counts
+    dtype = np.float32 if smooth else np.int32
+
+    @jit(nopython=True, fastmath=True, parallel=True, cache=True)
+    def kernel(h, w, k, x_min, x_max, y_min, y_max, m, fast_interior, work):
+        result = np.zeros((h, w), dtype=dtype)
+
+        dx = (x_max - x_min) / w
+        dy = (y_max - y_min) / h
+
+        for i in prange(h):
+            y = y_min + i * dy
+            iterations = 0
+            at_k = 0
+            for j in range(w):
+                x = x_min + j * dx
+                if not fast_interior:
+                    n, z, steps = ITERATE(f, 0.0j, complex(x, y), 0, k, m, 4.0)
+                elif has_bulbs and m == 2 and in_cardioid_or_bulb(x, y):
+                    n, z, steps = k, 0.0j, 0
+                else:
+                    n, z, steps = ITERATE_PERIODIC(f, 0.0j, complex(x, y), 0, k, m, 4.0)
+                if smooth:
+                    result[i, j] = smooth_count(n, z, k, m, 4.0)
+                else:
+                    result[i, j] = n
+                iterations += steps
+                at_k += n >= k
+            add_work(work, iterations, w, at_k)
+
+        return result
+
+    return kernel
+
+
+def make_julia_kernel(f, smooth=False):
+    # f is the index of the formula in FORMULAS, see JULIA_FORMULAS
+    dtype = np.float32 if smooth else np.int32
+
+    @jit(nopython=True, fastmath=True, parallel=True, cache=True)
+    def kernel(h, w, k, x_min, x_max, y_min, y_max, c, m_j, fast_interior, work):
+        result = np.zeros((h, w), dtype=dtype)
+
+        dx = (x_max - x_min) / w
+        dy = (y_max - y_min) / h
+
+        R = max(abs(c), 2.0)
+        R2 = R * R
+
+        for i in prange(h):
+            y = y_min + i * dy
+            iterations = 0
+            at_k = 0
+            for j in range(w):
+                x = x_min + j * dx
+                if fast_interior:
+                    n, z, steps = ITERATE_PERIODIC(f, complex(x, y), c, 0, k, m_j, R2)
+                else:
+                    n, z, steps = ITERATE(f, complex(x, y), c, 0, k, m_j, R2)
+                if smooth:
+                    result[i, j] = smooth_count(n, z, k, m_j, R2)
+                else:
+                    result[i, j] = n
+                iterations += steps
+                at_k += n >= k
+            add_work(work, iterations, w, at_k)
+
+        return result
+
+    return kernel
+
+
+@jit(nopython=True, parallel=True, cache=True)
+def smooth_from_state(Z, N, k, m, bailout2):
+    # Normalized counts from a resumable state (final z and count per pixel)
+    h, w = N.shape
+    result = np.empty((h, w), dtype=np.float32)
+    for i in prange(h):
+        for j in range(w):
+            result[i, j] = smooth_count(N[i, j], Z[i, j], k, m, bailout2)
+    return result
+
+
+@jit(nopython=True, fastmath=True, parallel=True, cache=True)
+def pixel_grid(h, w, x_min, x_max, y_min, y_max):
+    # Pixel coordinates computed exactly like inside the kernels
+    grid = np.empty((h, w), dtype=np.complex128)
+
+    dx = (x_max - x_min) / w
+    dy = (y_max - y_min) / h
+
+    for i in prange(h):
+        y = y_min + i * dy
+        for j in range(w):
+            x = x_min + j * dx
+            grid[i, j] = complex(x, y)
+
+    return grid
+
+
+def make_mandelbrot_state_kernel(f, has_bulbs):
+    # Resumable variant: advances the orbits stored in Z/N (final z and
+    # iteration count per pixel) in place up to k. Escaped pixels return
+    # immediately, so only the unescaped ones do any work (and are counted
+    # as computed in `work`).
+    @jit(nopython=True, fastmath=True, parallel=True, cache=True)
+    def kernel(Z, N, k, x_min, x_max, y_min, y_max, m, fast_interior, work):
+        h, w = N.shape
+
+        dx = (x_max - x_min) / w
+        dy = (y_max - y_min) / h
+
+        for i in prange(h):
+            y = y_min + i * dy
+            iterations = 0
+            pixels = 0
+            at_k = 0
+            for j in range(w):
+                z = Z[i, j]
+                if N[i, j] >= k or z.real * z.real + z.imag * z.imag > 4.0:
+                    continue
+                x = x_min + j * dx
+                if not fast_interior:
+                    n, z, steps = ITERATE(f, z, complex(x, y), N[i, j], k, m, 4.0)
+                elif has_bulbs and m == 2 and in_cardioid_or_bulb(x, y):
+                    n, steps = k, 0
+                else:
+                    n, z, steps = ITERATE_PERIODIC(f, z, complex(x, y), N[i, j], k, m, 4.0)
+                N[i, j] = n
+                Z[i, j] = z
+                iterations += steps
+                pixels += 1
+                at_k += n >= k
+            add_work(work, iterations, pixels, at_k)
+
+    return kernel
+
+
+def make_julia_state_kernel(f):
+    @jit(nopython=True, fastmath=True, parallel=True, cache=True)
+    def kernel(Z, N, k, c, m_j, fast_interior, work):
+        h, w = N.shape
+
+        R = max(abs(c), 2.0)
+        R2 = R * R
+
+        for i in prange(h):
+            iterations = 0
+            pixels = 0
+            at_k = 0
+            for j in range(w):
+                z = Z[i, j]
+                if N[i, j] >= k or z.real * z.real + z.imag * z.imag > R2:
+                    continue
+                if fast_interior:
+                    n, z, steps = ITERATE_PERIODIC(f, z, c, N[i, j], k, m_j, R2)
+                else:
+                    n, z, steps = ITERATE(f, z, c, N[i, j], k, m_j, R2)
+                N[i, j] = n
+                Z[i, j] = z
+                iterations += steps
+                pixels += 1
+                at_k += n >= k
+            add_work(work, iterations, pixels, at_k)
+
+    return kernel
+
+
+JULIA_ITERATE = [MANDELBROT_ITERATE[f] for f in JULIA_FORMULAS]
+JULIA_ITERATE_PERIODIC = [MANDELBROT_ITERATE_PERIODIC[f] for f in JULIA_FORMULAS]
+
+# Only z^m + c (func_id 0) has the analytic cardioid/bulb test (for m = 2)
+MANDELBROT_KERNELS = [make_mandelbrot_kernel(f, f == 0) for f in range(len(FORMULAS))]
+JULIA_KERNELS = [make_julia_kernel(f) for f in JULIA_FORMULAS]
+
+MANDELBROT_SMOOTH_KERNELS = [
+    make_mandelbrot_kernel(f, f == 0, smooth=True) for f in range(len(FORMULAS))
+]
+JULIA_SMOOTH_KERNELS = [make_julia_kernel(f, smooth=True) for f in JULIA_FORMULAS]
+
+MANDELBROT_STATE_KERNELS = [make_mandelbrot_state_kernel(f, f == 0) for f in range(len(FORMULAS))]
+JULIA_STATE_KERNELS = [make_julia_state_kernel(f) for f in JULIA_FORMULAS]
@@ -0,0 +1,238 @@
+import numpy as np
+from numba import jit, prange
+
+from utils.kernels import JULIA_FORMULAS, add_work, in_cardioid_or_bulb, smooth_count
+
+# Lane-batched (SIMD) renderer for the polynomial formulas.
+#
+# The escape loop of the pixel-by-pixel kernels exits as soon as its pixel
+# escapes, so the compiler cannot run several pixels in one vector register.
+# Here every thread keeps LANES pixels of its row in flight, with z split in
+# real and imaginary arrays, and advances all of them together with masked
+# updates: a lane that has escaped (or reached k) keeps its z and count.
+# That loop has no branches and LLVM vectorizes it.
+#
+# Once REFILL lanes have finished, they write their count and are refilled
+# with the next pixels of the row, so a lane stuck in the interior does not
+# hold the others back.
+#
+# The arithmetic is that of the pixel-by-pixel kernels, but under fastmath
+# LLVM fuses multiplies and adds into FMAs differently in this vector loop
+# than in the scalar one, and near the boundary of the set the orbits
+# amplify that last-bit difference. A few pixels get another count: at most
+# MAX_MISMATCH of them in float64, which the benchmark checks. Disabling
+# contraction here alone does not help, the scalar kernels contract too.
+#
+# Only z^m + c and z^m + 1/c (the first two formulas of both pages) can be
+# written on the components like this.
+
+LANES = 16  # one AVX-512 register of float32, two of float64
+REFILL = 8  # finished lanes that trigger a refill, half of them
+LANE_FORMULAS = (0, 1)  # indices in FORMULAS
+MAX_MISMATCH = 0.005  # fraction of pixels whose float64 count may differ
+
+
+@jit(nopython=True, fastmath=True, inline="always", cache=True)
+def ipow_split(zr, zi, m):
+    # z^m on separate components by repeated squaring, like ipow (m >= 1)
+    if m == 2:
+        return zr * zr - zi * zi, (zr + zr) * zi
+    rr, ri = zr, zi
+    pr, pi = zr, zi
+    m -= 1
+    while m > 0:
+        if m & 1:
+            rr, ri = rr * pr - ri * pi, rr * pi + ri * pr
+        m >>= 1
+        if m > 0:
+            pr, pi = pr * pr - pi * pi, (pr + pr) * pi
+    return rr, ri
+
+
+@jit(nopython=True, fastmath=True, cache=True)
+def advance_lanes(zr, zi, ar, ai, count, live, k, m, bailout2, target):
+    # Iterates z -> z^m + a on every lane until at most `target` lanes are
+    # still running. live is left at 0 for the lanes whose last step found
+    # them escaped or at k.
+    while True:
+        active = 0
+        for lane in range(zr.size):
+            r = zr[lane]
+            q = zi[lane]
+            inside = (r * r + q * q <= bailout2) & (count[lane] < k)
+            pr, pq = ipow_split(r, q, m)
+            zr[lane] = pr + ar[lane] if inside else r
+            zi[lane] = pq + ai[lane] if inside else q
+            count[lane] += inside
+            live[lane] = inside
+            active += inside
+        if active <= target:
+            return
+
+
+@jit(nopython=True, fastmath=True, cache=True)
+def inverse_split(x, y):
+    # Components of 1/(x + iy)
+    d = x * x + y * y
+    return x / d, -y / d
+
+
+def make_mandelbrot_lanes_kernel(f, dtype, smooth=False):
+    # Same arguments and result as make_mandelbrot_kernel, iterating in
+    # dtype (np.float32 or np.float64)
+    out = np.float32 if smooth else np.int32
+
+    @jit(nopython=True, fastmath=True, parallel=True, cache=True)
+    def kernel(h, w, k, x_min, x_max, y_min, y_max, m, fast_interior, work):
+        result = np.zeros((h, w), dtype=out)
+        bailout2 = dtype(4.0)
+
+        dx = (x_max - x_min) / w
+        dy = (y_max - y_min) / h
+
+        for i in prange(h):
+            y = y_min + i * dy
+            zr = np.zeros(LANES, dtype=dtype)
+            zi = np.zeros(LANES, dtype=dtype)
+            ar = np.zeros(LANES, dtype=dtype)
+            ai = np.zeros(LANES, dtype=dtype)
+            count = np.full(LANES, k, dtype=np.int32)  # idle lanes stay at k
+            live = np.zeros(LANES, dtype=np.int32)
+            pixel = np.full(LANES, -1, dtype=np.int64)
+            iterations = 0
+            at_k = 0
+            j = 0
+            while True:
+                busy = 0
+                for lane in range(LANES):
+                    p = pixel[lane]
+                    if p >= 0 and (live[lane] == 0 or count[lane] >= k):
+                        if smooth:
+                            z = complex(float(zr[lane]), float(zi[lane]))
+                            result[i, p] = smooth_count(count[lane], z, k, m, 4.0)
+                        else:
+                            result[i, p] = count[lane]
+                        # Lanes start at count 0, so the count is the steps run
+                        iterations += count[lane]
+                        at_k += count[lane] >= k
+                        pixel[lane] = -1
+                    while pixel[lane] < 0 and j < w:
+                        x = x_min + j * dx
+                        if f == 0 and fast_interior and m == 2 and in_cardioid_or_bulb(x, y):
+                            result[i, j] = k
+                            at_k += 1
+                        else:
+                            pixel[lane] = j
+                            zr[lane] = 0.0
+                            zi[lane] = 0.0
+                            count[lane] = 0
+                            live[lane] = 1
+                            if f == 0:
+                                ar[lane] = x
+                                ai[lane] = y
+                            elif x == 0 and y == 0:
+                                # 1/c is undefined and z stays at 0, which a = 0 does too
+                                ar[lane] = 0.0
+                                ai[lane] = 0.0
+                            else:
+                                ar[lane], ai[lane] = inverse_split(x, y)
+                        j += 1
+                    if pixel[lane] >= 0:
+                        busy += 1
+                if busy == 0:
+                    break
+                # Refill early while there are pixels left, drain at the end
+                target = busy - REFILL if j < w else 0
+                advance_lanes(zr, zi, ar, ai, count, live, k, m, bailout2, target)
+            add_work(work, iterations, w, at_k)
+
+        return result
+
+    return kernel
+
+
+def make_julia_lanes_kernel(f, dtype, smooth=False):
+    out = np.float32 if smooth else np.int32
+
+    @jit(nopython=True, fastmath=True, parallel=True, cache=True)
+    def kernel(h, w, k, x_min, x_max, y_min, y_max, c, m_j, fast_interior, work):
+        result = np.zeros((h, w), dtype=out)
+
+        dx = (x_max - x_min) / w
+        dy = (y_max - y_min) / h
+
+        R = max(abs(c), 2.0)
+        R2 = R * R
+        bailout2 = dtype(R2)
+        if f == 1 and c != 0:
+            cr, ci = inverse_split(c.real, c.imag)
+        else:
+            cr, ci = c.real, c.imag
+        # With 1/c undefined z stays constant: it never escapes or it
+        # already has
+        constant = f == 1 and c == 0
+
+        for i in prange(h):
+            y = y_min + i * dy
+            zr = np.zeros(LANES, dtype=dtype)
+            zi = np.zeros(LANES, dtype=dtype)
+            ar = np.full(LANES, cr, dtype=dtype)
+            ai = np.full(LANES, ci, dtype=dtype)
+            count = np.full(LANES, k, dtype=np.int32)
+            live = np.zeros(LANES, dtype=np.int32)
+            pixel = np.full(LANES, -1, dtype=np.int64)
+            iterations = 0
+            at_k = 0
+            j = 0
+            while True:
+                busy = 0
+                for lane in range(LANES):
+                    p = pixel[lane]
+                    if p >= 0 and (live[lane] == 0 or count[lane] >= k):
+                        if smooth:
+                            z = complex(float(zr[lane]), float(zi[lane]))
+                            result[i, p] = smooth_count(count[lane], z, k, m_j, R2)
+                        else:
+                            result[i, p] = count[lane]
+                        iterations += count[lane]
+                        at_k += count[lane] >= k
+                        pixel[lane] = -1
+                    while pixel[lane] < 0 and j < w:
+                        zx = dtype(x_min + j * dx)
+                        zy = dtype(y)
+                        if constant:
+                            result[i, j] = k if zx * zx + zy * zy <= bailout2 else 0
+                            at_k += result[i, j] >= k
+                        else:
+                            pixel[lane] = j
+                            zr[lane] = zx
+                            zi[lane] = zy
+                            count[lane] = 0
+                            live[lane] = 1
+                        j += 1
+                    if pixel[lane] >= 0:
+                        busy += 1
+                if busy == 0:
+                    break
+                target = busy - REFILL if j < w else 0
+                advance_lanes(zr, zi, ar, ai, count, live, k, m_j, bailout2, target)
+            add_work(work, iterations, w, at_k)
+
+        return result
+
+    return kernel
+
+
+def lane_kernels(dtype, smooth=False):
+    # Mandelbrot and Julia kernels by func_id, only for the formulas that
+    # have them
+    mandelbrot = {f: make_mandelbrot_lanes_kernel(f, dtype, smooth) for f in LANE_FORMULAS}
+    julia = {
+        func_id: make_julia_lanes_kernel(f, dtype, smooth)
+        for func_id, f in enumerate(JULIA_FORMULAS) if f in LANE_FORMULAS
+    }
+    return mandelbrot, julia
+
+
+MANDELBROT_LANE_KERNELS, JULIA_LANE_KERNELS = lane_kernels(np.float64)
+MANDELBROT_SMOOTH_LANE_KERNELS, JULIA_SMOOTH_LANE_KERNELS = lane_kernels(np.float64, smooth=True)
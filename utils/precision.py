@@ -0,0 +1,37 @@
+import numpy as np
+
+from utils.lanes import lane_kernels
+
+# Single precision for overview renders.
+#
+# The default kernels iterate in complex128. While a pixel is much wider
+# than the float32 resolution of its coordinates, float32 gives the same
+# picture with half the register width, so twice as many pixels per SIMD
+# register of the lane-batched renderer (see lanes.py), which is what float32
+# renders run on. Only the formulas that renderer has (z^m + c and z^m + 1/c)
+# can be computed in float32; the rest always iterate in float64.
+
+PRECISIONS = ["Doble (float64)", "Simple (float32)", "Automática"]
+
+# Smallest pixel spacing, relative to the largest coordinate of the view, at
+# which the automatic mode uses float32: 2^11 float32 steps per pixel, so
+# rounding stays far below a pixel
+FLOAT32_MIN_SPACING = 2.0**-12
+
+# By func_id, only for the formulas that have them
+MANDELBROT_FLOAT32_KERNELS, JULIA_FLOAT32_KERNELS = lane_kernels(np.float32)
+MANDELBROT_SMOOTH_FLOAT32_KERNELS, JULIA_SMOOTH_FLOAT32_KERNELS = lane_kernels(np.float32, smooth=True)
+
+
+def resolve_precision(precision, kernels, func_id, m, h, w, x_min, x_max, y_min, y_max):
+    # PRECISIONS[1] if the render will iterate in float32, PRECISIONS[0]
+    # otherwise. The automatic mode chooses float32 when the pixel spacing
+    # is at least FLOAT32_MIN_SPACING times the largest coordinate.
+    if precision == PRECISIONS[0] or func_id not in kernels or m < 1:
+        return PRECISIONS[0]
+    if precision == PRECISIONS[2]:
+        spacing = min((x_max - x_min) / w, (y_max - y_min) / h)
+        scale = max(abs(x_min), abs(x_max), abs(y_min), abs(y_max), 1.0)
+        if spacing < FLOAT32_MIN_SPACING * scale:
+            return PRECISIONS[0]
+    return PRECISIONS[1]
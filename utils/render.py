@@ -0,0 +1,289 @@
+from utils.kernels import MANDELBROT_KERNELS, JULIA_KERNELS, MANDELBROT_SMOOTH_KERNELS, JULIA_SMOOTH_KERNELS, kernel_lock
+from utils.tiling import MANDELBROT_TILED_KERNELS, JULIA_TILED_KERNELS
+from utils.lanes import (
+    MANDELBROT_LANE_KERNELS, JULIA_LANE_KERNELS, MANDELBROT_SMOOTH_LANE_KERNELS, JULIA_SMOOTH_LANE_KERNELS,
+)
+from utils.cache import render_cache
+from utils.stats import count, count_escapes, count_work, new_work, phase
+from utils.histogram import iteration_cdf
+from utils.incremental import incremental
+from utils.distance import MANDELBROT_DISTANCE_KERNELS, JULIA_DISTANCE_KERNELS
+from utils.antialias import antialias_mandelbrot, antialias_julia
+from utils.progressive import progressive_mandelbrot, progressive_julia
+from utils.symmetry import SYMMETRIES, mandelbrot_symmetry, julia_symmetry, render_symmetric
+from utils.scheduling import SCHEDULES, ROW_CHUNK, threads_and_chunks, compute_mandelbrot_scheduled, compute_julia_scheduled
+from utils.precision import (
+    PRECISIONS, MANDELBROT_FLOAT32_KERNELS, JULIA_FLOAT32_KERNELS, MANDELBROT_SMOOTH_FLOAT32_KERNELS,
+    JULIA_SMOOTH_FLOAT32_KERNELS, resolve_precision,
+)
+
+# Compute stage shared by the Streamlit pages and the batch renderer. Nothing
+# here imports streamlit or matplotlib.
+
+def mandelbrot_precision(precision, func_id, m, h, w, x_min, x_max, y_min, y_max):
+    return resolve_precision(precision, MANDELBROT_FLOAT32_KERNELS, func_id, m, h, w, x_min, x_max, y_min, y_max)
+
+def julia_precision(precision, func_id, m_j, h, w, x_min, x_max, y_min, y_max):
+    return resolve_precision(precision, JULIA_FLOAT32_KERNELS, func_id, m_j, h, w, x_min, x_max, y_min, y_max)
+
+def compute_mandelbrot_numba(h, w, k, x_min, x_max, y_min, y_max, func_id, m, fast_interior=False, smooth=False, precision=PRECISIONS[0], distance=False):
+    # Dispatch once to the kernel specialized for this formula.
+    # fast_interior skips the cardioid/bulb analytically (z^2 + c) and stops
+    # periodic orbits early; the returned counts are the same.
+    # smooth returns float32 normalized counts computed in the same pass.
+    # precision is one of PRECISIONS; float32 only applies to the formulas
+    # that have a float32 kernel.
+    # distance returns float32 exterior distances instead of counts (see
+    # distance.py), only for the formulas in MANDELBROT_DISTANCE_KERNELS.
+    # The work of every kernel goes to the stats of the current render.
+    if distance:
+        kernel = MANDELBROT_DISTANCE_KERNELS[func_id]
+    elif mandelbrot_precision(precision, func_id, m, h, w, x_min, x_max, y_min, y_max) == PRECISIONS[1]:
+        kernel = (MANDELBROT_SMOOTH_FLOAT32_KERNELS if smooth else MANDELBROT_FLOAT32_KERNELS)[func_id]
+    else:
+        kernel = (MANDELBROT_SMOOTH_KERNELS if smooth else MANDELBROT_KERNELS)[func_id]
+    work = new_work()
+    with kernel_lock:
+        W = kernel(h, w, k, x_min, x_max, y_min, y_max, m, fast_interior, work)
+    count_work(work)
+    return W
+
+def compute_julia_numba(h, w, k, x_min, x_max, y_min, y_max, func_id, c, m_j, fast_interior=False, smooth=False, precision=PRECISIONS[0], distance=False):
+    if distance:
+        kernel = JULIA_DISTANCE_KERNELS[func_id]
+    elif julia_precision(precision, func_id, m_j, h, w, x_min, x_max, y_min, y_max) == PRECISIONS[1]:
+        kernel = (JULIA_SMOOTH_FLOAT32_KERNELS if smooth else JULIA_FLOAT32_KERNELS)[func_id]
+    else:
+        kernel = (JULIA_SMOOTH_KERNELS if smooth else JULIA_KERNELS)[func_id]
+    work = new_work()
+    with kernel_lock:
+        W = kernel(h, w, k, x_min, x_max, y_min, y_max, complex(c), m_j, fast_interior, work)
+    count_work(work)
+    return W
+
+# Rendering engines selectable from the pages
+ENGINES = ["Píxel a píxel", "Mariani-Silver (trazado de bordes)", "Vectorizado (SIMD)"]
+
+def compute_mandelbrot_tiled(h, w, k, x_min, x_max, y_min, y_max, func_id, m, tile=64):
+    # Border tracing renderer, only for the formulas in
+    # MANDELBROT_TILED_KERNELS: returns the iteration array and the number of
+    # pixels actually iterated
+    kernel = MANDELBROT_TILED_KERNELS[func_id]
+    work = new_work()
+    with kernel_lock:
+        W = kernel(h, w, k, x_min, x_max, y_min, y_max, 0j, m, 4.0, tile, work)
+    count_work(work)
+    return W, int(work[:, 1].sum())
+
+def compute_julia_tiled(h, w, k, x_min, x_max, y_min, y_max, func_id, c, m_j, tile=64):
+    c = complex(c)
+    R = max(abs(c), 2.0)
+    kernel = JULIA_TILED_KERNELS[func_id]
+    work = new_work()
+    with kernel_lock:
+        W = kernel(h, w, k, x_min, x_max, y_min, y_max, c, m_j, R * R, tile, work)
+    count_work(work)
+    return W, int(work[:, 1].sum())
+
+def compute_mandelbrot_lanes(h, w, k, x_min, x_max, y_min, y_max, func_id, m, fast_interior=False, smooth=False):
+    # Lane-batched renderer, only for the formulas in MANDELBROT_LANE_KERNELS
+    # and m >= 1; same counts as compute_mandelbrot_numba but for a few
+    # boundary pixels (see lanes.py)
+    kernel = (MANDELBROT_SMOOTH_LANE_KERNELS if smooth else MANDELBROT_LANE_KERNELS)[func_id]
+    work = new_work()
+    with kernel_lock:
+        W = kernel(h, w, k, x_min, x_max, y_min, y_max, m, fast_interior, work)
+    count_work(work)
+    return W
+
+def compute_julia_lanes(h, w, k, x_min, x_max, y_min, y_max, func_id, c, m_j, fast_interior=False, smooth=False):
+    kernel = (JULIA_SMOOTH_LANE_KERNELS if smooth else JULIA_LANE_KERNELS)[func_id]
+    work = new_work()
+    with kernel_lock:
+        W = kernel(h, w, k, x_min, x_max, y_min, y_max, complex(c), m_j, fast_interior, work)
+    count_work(work)
+    return W
+
+def compute_mandelbrot_view(h, w, k, x_min, x_max, y_min, y_max, func_id, m, fast_interior=False, engine=ENGINES[0], smooth=False, precision=PRECISIONS[0]):
+    # One-off render of an (h, w) view with the chosen engine, without the
+    # cache, the incremental state or the row schedules
+    if mandelbrot_precision(precision, func_id, m, h, w, x_min, x_max, y_min, y_max) == PRECISIONS[1]:
+        return compute_mandelbrot_numba(h, w, k, x_min, x_max, y_min, y_max, func_id, m, fast_interior, smooth, precision)
+    if engine == ENGINES[2] and func_id in MANDELBROT_LANE_KERNELS and m >= 1:
+        return compute_mandelbrot_lanes(h, w, k, x_min, x_max, y_min, y_max, func_id, m, fast_interior, smooth)
+    if engine == ENGINES[1] and func_id in MANDELBROT_TILED_KERNELS and not smooth:
+        return compute_mandelbrot_tiled(h, w, k, x_min, x_max, y_min, y_max, func_id, m)[0]
+    return compute_mandelbrot_numba(h, w, k, x_min, x_max, y_min, y_max, func_id, m, fast_interior, smooth)
+
+def compute_julia_view(h, w, k, x_min, x_max, y_min, y_max, func_id, c, m_j, fast_interior=False, engine=ENGINES[0], smooth=False, precision=PRECISIONS[0]):
+    if julia_precision(precision, func_id, m_j, h, w, x_min, x_max, y_min, y_max) == PRECISIONS[1]:
+        return compute_julia_numba(h, w, k, x_min, x_max, y_min, y_max, func_id, c, m_j, fast_interior, smooth, precision)
+    if engine == ENGINES[2] and func_id in JULIA_LANE_KERNELS and m_j >= 1:
+        return compute_julia_lanes(h, w, k, x_min, x_max, y_min, y_max, func_id, c, m_j, fast_interior, smooth)
+    if engine == ENGINES[1] and func_id in JULIA_TILED_KERNELS and not smooth:
+        return compute_julia_tiled(h, w, k, x_min, x_max, y_min, y_max, func_id, c, m_j)[0]
+    return compute_julia_numba(h, w, k, x_min, x_max, y_min, y_max, func_id, c, m_j, fast_interior, smooth)
+
+def mandelbrot_cache_params(func_id, m, k, n, x_min, x_max, y_min, y_max, engine, smooth=False, precision=PRECISIONS[0], distance=False, antialias=False, symmetric=False):
+    # precision is the resolved one (PRECISIONS[0] or PRECISIONS[1]);
+    # symmetric when part of the image was mirrored (see symmetry.py)
+    params = dict(
+        kind="mandelbrot", func_id=func_id, m=m, k=k, n=n,
+        x=(x_min, x_max), y=(y_min, y_max), engine=engine, smooth=smooth, precision=precision,
+    )
+    # Only in the key when set, so the renders cached before keep theirs
+    if distance:
+        params["distance"] = True
+    if antialias:
+        params["antialias"] = True
+    if symmetric:
+        params["symmetric"] = True
+    return params
+
+def julia_cache_params(func_id, m_j, c, k, n, x_min, x_max, y_min, y_max, engine, smooth=False, precision=PRECISIONS[0], distance=False, antialias=False, symmetric=False):
+    params = dict(
+        kind="julia", func_id=func_id, m=m_j, c=c, k=k, n=n,
+        x=(x_min, x_max), y=(y_min, y_max), engine=engine, smooth=smooth, precision=precision,
+    )
+    if distance:
+        params["distance"] = True
+    if antialias:
+        params["antialias"] = True
+    if symmetric:
+        params["symmetric"] = True
+    return params
+
+def render_cdf(W, k, params):
+    # Histogram CDF of the counts W (see histogram.py), cached next to the
+    # render with the same params
+    with phase("histogram"):
+        key = render_cache.key(**params, histogram=True)
+        cdf = render_cache.get(key)
+        if cdf is None:
+            cdf = iteration_cdf(W, k)
+            render_cache.put(key, cdf)
+    return cdf
+
+def progressive_passes(passes, preview):
+    # Shows the coarse passes of a progressive render (see progressive.py)
+    # with preview(stride, W) and returns the full resolution counts
+    for stride, W in passes:
+        if stride > 1:
+            preview(stride, W)
+    return W
+
+def julia_height(n, x_min, x_max, y_min, y_max):
+    # Julia images keep the aspect ratio of the view, n is the width
+    return int(n * (y_max - y_min) / (x_max - x_min))
+
+def render_mandelbrot(n, k, x_min, x_max, y_min, y_max, func_id, m, fast_interior=False, engine=ENGINES[0], smooth=False, resume=True, schedule=SCHEDULES[0], threads=None, precision=PRECISIONS[0], symmetric=True, distance=False, antialias=False, histogram=False, preview=None):
+    # n x n iteration array through the disk cache. resume keeps the orbits
+    # in memory so a later render of the same view with higher k continues
+    # them; one-off renders (batch jobs) skip it to save the memory.
+    # schedule picks how rows are shared between the `threads` Numba threads;
+    # the balanced schedules compute integer counts from scratch.
+    # symmetric only computes the part of the view that is not the mirror
+    # image of another (see symmetry.py). distance returns exterior
+    # distances instead (float64 and pixel by pixel), for the formulas that
+    # have them. antialias supersamples the pixels on edges of the integer
+    # counts (see antialias.py), which become float32 means. histogram
+    # returns the CDF of the counts along with them, None for distances.
+    # preview(stride, W), for the integer counts of the pixel by pixel
+    # engine, computes them progressively and is shown every coarse pass.
+    distance = distance and func_id in MANDELBROT_DISTANCE_KERNELS
+    antialias = antialias and not smooth and not distance
+    precision = PRECISIONS[0] if distance else mandelbrot_precision(precision, func_id, m, n, n, x_min, x_max, y_min, y_max)
+    progressive = preview is not None and engine == ENGINES[0] and not smooth and not distance and not antialias and precision == PRECISIONS[0]
+
+    def view(h, w, x_min, x_max, y_min, y_max):
+        if distance:
+            return compute_mandelbrot_numba(h, w, k, x_min, x_max, y_min, y_max, func_id, m, fast_interior, distance=True)
+        if precision == PRECISIONS[1]:
+            return compute_mandelbrot_numba(h, w, k, x_min, x_max, y_min, y_max, func_id, m, fast_interior, smooth, precision)
+        # The other formulas fall back to the pixel by pixel kernels
+        if engine == ENGINES[2] and func_id in MANDELBROT_LANE_KERNELS and m >= 1:
+            return compute_mandelbrot_lanes(h, w, k, x_min, x_max, y_min, y_max, func_id, m, fast_interior, smooth)
+        # Border tracing only works on integer counts
+        if engine == ENGINES[1] and func_id in MANDELBROT_TILED_KERNELS and not smooth:
+            W, evaluated = compute_mandelbrot_tiled(h, w, k, x_min, x_max, y_min, y_max, func_id, m)
+            count(evaluated_pixels=int(evaluated), traced_pixels=W.size)
+            return W
+        if schedule != SCHEDULES[0] and not smooth:
+            return compute_mandelbrot_scheduled(h, w, k, x_min, x_max, y_min, y_max, func_id, m, schedule)[0]
+        if resume:
+            return incremental.mandelbrot(h, w, k, x_min, x_max, y_min, y_max, func_id, m, fast_interior, smooth)
+        return compute_mandelbrot_numba(h, w, k, x_min, x_max, y_min, y_max, func_id, m, fast_interior, smooth)
+
+    def antialiased_view(h, w, x_min, x_max, y_min, y_max):
+        W = view(h, w, x_min, x_max, y_min, y_max)
+        return antialias_mandelbrot(W, k, x_min, x_max, y_min, y_max, func_id, m)
+
+    symmetry = mandelbrot_symmetry(func_id) if symmetric and not progressive else SYMMETRIES[0]
+
+    @threads_and_chunks(threads, ROW_CHUNK if schedule == SCHEDULES[2] else 0)
+    def compute():
+        if progressive:
+            return progressive_passes(progressive_mandelbrot(n, n, k, x_min, x_max, y_min, y_max, func_id, m), preview)
+        return render_symmetric(antialiased_view if antialias else view, n, n, x_min, x_max, y_min, y_max, symmetry)
+
+    # fast_interior, schedule, threads and preview do not change the result
+    # (but for rounding), so they are not part of the key. Mirroring changes
+    # a few pixels (see symmetry.py), so mirrored renders are kept apart.
+    params = mandelbrot_cache_params(
+        func_id, m, k, n, x_min, x_max, y_min, y_max, engine, smooth, precision, distance, antialias,
+        symmetry != SYMMETRIES[0],
+    )
+    W = render_cache.get_or_compute(compute, **params)
+    if not distance:
+        count_escapes(W, k)
+    if histogram:
+        return W, None if distance else render_cdf(W, k, params)
+    return W
+
+def render_julia(n, k, x_min, x_max, y_min, y_max, func_id, c, m_j, fast_interior=False, engine=ENGINES[0], smooth=False, resume=True, schedule=SCHEDULES[0], threads=None, precision=PRECISIONS[0], symmetric=True, distance=False, antialias=False, histogram=False, preview=None):
+    h = julia_height(n, x_min, x_max, y_min, y_max)
+    w = n
+    distance = distance and func_id in JULIA_DISTANCE_KERNELS
+    antialias = antialias and not smooth and not distance
+    precision = PRECISIONS[0] if distance else julia_precision(precision, func_id, m_j, h, w, x_min, x_max, y_min, y_max)
+    progressive = preview is not None and engine == ENGINES[0] and not smooth and not distance and not antialias and precision == PRECISIONS[0]
+
+    def view(h, w, x_min, x_max, y_min, y_max):
+        if distance:
+            return compute_julia_numba(h, w, k, x_min, x_max, y_min, y_max, func_id, c, m_j, fast_interior, distance=True)
+        if precision == PRECISIONS[1]:
+            return compute_julia_numba(h, w, k, x_min, x_max, y_min, y_max, func_id, c, m_j, fast_interior, smooth, precision)
+        if engine == ENGINES[2] and func_id in JULIA_LANE_KERNELS and m_j >= 1:
+            return compute_julia_lanes(h, w, k, x_min, x_max, y_min, y_max, func_id, c, m_j, fast_interior, smooth)
+        if engine == ENGINES[1] and func_id in JULIA_TILED_KERNELS and not smooth:
+            W, evaluated = compute_julia_tiled(h, w, k, x_min, x_max, y_min, y_max, func_id, c, m_j)
+            count(evaluated_pixels=int(evaluated), traced_pixels=W.size)
+            return W
+        if schedule != SCHEDULES[0] and not smooth:
+            return compute_julia_scheduled(h, w, k, x_min, x_max, y_min, y_max, func_id, c, m_j, schedule)[0]
+        if resume:
+            return incremental.julia(h, w, k, x_min, x_max, y_min, y_max, func_id, c, m_j, fast_interior, smooth)
+        return compute_julia_numba(h, w, k, x_min, x_max, y_min, y_max, func_id, c, m_j, fast_interior, smooth)
+
+    def antialiased_view(h, w, x_min, x_max, y_min, y_max):
+        W = view(h, w, x_min, x_max, y_min, y_max)
+        return antialias_julia(W, k, x_min, x_max, y_min, y_max, func_id, c, m_j)
+
+    symmetry = julia_symmetry(c, m_j) if symmetric and not progressive else SYMMETRIES[0]
+
+    @threads_and_chunks(threads, ROW_CHUNK if schedule == SCHEDULES[2] else 0)
+    def compute():
+        if progressive:
+            return progressive_passes(progressive_julia(h, w, k, x_min, x_max, y_min, y_max, func_id, c, m_j), preview)
+        return render_symmetric(antialiased_view if antialias else view, h, w, x_min, x_max, y_min, y_max, symmetry)
+
+    params = julia_cache_params(
+        func_id, m_j, c, k, n, x_min, x_max, y_min, y_max, engine, smooth, precision, distance, antialias,
+        symmetry != SYMMETRIES[0],
+    )
+    W = render_cache.get_or_compute(compute, **params)
+    if not distance:
+        count_escapes(W, k)
+    if histogram:
+        return W, None if distance else render_cdf(W, k, params)
+    return W
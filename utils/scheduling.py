@@ -0,0 +1,165 @@
+import argparse
+import time
+from contextlib import contextmanager
+
+import numba
+import numpy as np
+from numba import jit, prange
+
+from utils.kernels import add_work, kernel_lock
+from utils.stats import MAX_THREADS, count_work, new_work, thread_iterations, utilization
+from utils.tiling import PIXEL, MANDELBROT_PIXELS, JULIA_PIXELS
+
+# Load-balanced row scheduling for the pixel-by-pixel renderer.
+#
+# prange hands every thread one contiguous block of rows. Rows crossing the
+# interior of the set cost k iterations per pixel and rows outside it escape
+# almost at once, so the threads that get the interior band finish long after
+# the others. Two alternatives:
+#
+# - Interleaved rows: rows are reordered so every block holds rows spread
+#   over the whole image (0, T, 2T, ... then 1, T + 1, ...), which evens the
+#   blocks out at no cost.
+# - Dynamic queue: threads take ROW_CHUNK rows at a time from a shared
+#   counter (Numba's parallel chunksize), so nobody waits while work is left.
+#
+# The kernels also count the iterations done by every thread (see
+# stats.new_work). Iterations are what the time goes into, so mean / max of
+# those counts is the fraction of the thread time that did useful work (the
+# utilization).
+
+SCHEDULES = ["Bloques contiguos", "Filas intercaladas", "Cola dinámica"]
+ROW_CHUNK = 4  # rows per request in the dynamic queue
+
+
+def make_scheduled_kernel(p):
+    # Computes the rows in the order given by `rows` and adds the work done
+    # by each thread to its row of `work`
+    @jit(nopython=True, fastmath=True, parallel=True, cache=True)
+    def kernel(rows, w, k, x_min, x_max, y_min, y_max, c, m, bailout2, work):
+        h = rows.size
+        result = np.empty((h, w), dtype=np.int32)
+
+        dx = (x_max - x_min) / w
+        dy = (y_max - y_min) / h
+
+        for r in prange(h):
+            i = rows[r]
+            y = y_min + i * dy
+            iterations = 0
+            at_k = 0
+            for j in range(w):
+                n, steps = PIXEL(p, x_min + j * dx, y, c, k, m, bailout2)
+                result[i, j] = n
+                iterations += steps
+                at_k += n >= k
+            add_work(work, iterations, w, at_k)
+
+        return result
+
+    return kernel
+
+
+MANDELBROT_SCHEDULED_KERNELS = [make_scheduled_kernel(p) for p in MANDELBROT_PIXELS]
+JULIA_SCHEDULED_KERNELS = [make_scheduled_kernel(p) for p in JULIA_PIXELS]
+
+
+def row_order(h, schedule, threads):
+    if schedule == SCHEDULES[1]:
+        return np.concatenate([np.arange(t, h, threads) for t in range(threads)])
+    return np.arange(h)
+
+
+@contextmanager
+def threads_and_chunks(threads=None, chunksize=0):
+    # Numba thread count and parallel chunk size for the kernels called
+    # inside; both settings are local to the calling thread
+    previous = numba.get_num_threads()
+    if threads:
+        numba.set_num_threads(min(threads, MAX_THREADS))
+    try:
+        with numba.parallel_chunksize(chunksize):
+            yield
+    finally:
+        numba.set_num_threads(previous)
+
+
+def _scheduled(kernel, h, w, k, x_min, x_max, y_min, y_max, c, m, bailout2, schedule, threads):
+    with threads_and_chunks(threads, ROW_CHUNK if schedule == SCHEDULES[2] else 0):
+        threads = numba.get_num_threads()
+        order = row_order(h, schedule, threads)
+        work = new_work()
+        with kernel_lock:
+            start = time.perf_counter()
+            W = kernel(order, w, k, x_min, x_max, y_min, y_max, c, m, bailout2, work)
+            seconds = time.perf_counter() - start
+        count_work(work)
+    work = thread_iterations(work, threads)
+    return W, dict(schedule=schedule, threads=threads, seconds=seconds, work=work, utilization=utilization(work))
+
+
+def compute_mandelbrot_scheduled(h, w, k, x_min, x_max, y_min, y_max, func_id, m, schedule=SCHEDULES[1], threads=None):
+    # Returns the iteration array and a report with the wall time, the
+    # iterations of every thread and the utilization
+    kernel = MANDELBROT_SCHEDULED_KERNELS[func_id]
+    return _scheduled(kernel, h, w, k, x_min, x_max, y_min, y_max, 0j, m, 4.0, schedule, threads)
+
+
+def compute_julia_scheduled(h, w, k, x_min, x_max, y_min, y_max, func_id, c, m_j, schedule=SCHEDULES[1], threads=None):
+    c = complex(c)
+    R = max(abs(c), 2.0)
+    kernel = JULIA_SCHEDULED_KERNELS[func_id]
+    return _scheduled(kernel, h, w, k, x_min, x_max, y_min, y_max, c, m_j, R * R, schedule, threads)
+
+
+def thread_work(row_work, schedule, threads):
+    # Iterations every one of `threads` threads would do under a schedule,
+    # from the iterations of every row
+    h = row_work.size
+    if schedule == SCHEDULES[2]:
+        # Every chunk goes to the thread that becomes free first
+        busy = np.zeros(threads)
+        for start in range(0, h, ROW_CHUNK):
+            busy[busy.argmin()] += row_work[start:start + ROW_CHUNK].sum()
+        return busy
+    rows = row_order(h, schedule, threads)
+    return np.array([block.sum() for block in np.array_split(row_work[rows], threads)], dtype=np.float64)
+
+
+def simulated_utilization(row_work, schedule, threads):
+    # Utilization a schedule would get on `threads` cores, from the measured
+    # iterations of every row. Lets a small machine check the balance of a
+    # large one.
+    return utilization(thread_work(row_work, schedule, threads))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m utils.scheduling",
+        description="Compara el reparto de filas entre hilos al renderizar el conjunto de Mandelbrot.",
+    )
+    parser.add_argument("--n", type=int, default=2000)
+    parser.add_argument("--k", type=int, default=1000)
+    parser.add_argument("--func", type=int, default=0)
+    parser.add_argument("--m", type=int, default=2)
+    parser.add_argument("--threads", type=int, help="Hilos de Numba (por defecto, todos)")
+    parser.add_argument("--simulate", type=int, default=32, help="Núcleos para los que estimar la utilización")
+    args = parser.parse_args(argv)
+
+    view = (args.n, args.n, args.k, -2.0, 1.0, -1.5, 1.5, args.func, args.m)
+    with kernel_lock:
+        MANDELBROT_SCHEDULED_KERNELS[args.func](np.arange(8), 8, 10, -2.0, 1.0, -1.5, 1.5, 0j, args.m, 4.0, new_work())  # compile
+
+    print("Medido:")
+    for schedule in SCHEDULES:
+        W, report = compute_mandelbrot_scheduled(*view, schedule=schedule, threads=args.threads)
+        print(f"{schedule}, {report['threads']} hilos: {report['seconds']:.3f} s, utilización {100 * report['utilization']:.1f}%")
+
+    row_work = W.sum(axis=1, dtype=np.int64)
+    print(f"Estimado con {args.simulate} núcleos:")
+    for schedule in SCHEDULES:
+        print(f"{schedule}: utilización {100 * simulated_utilization(row_work, schedule, args.simulate):.1f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import numba
+import numpy as np
+from numba.core import event
+
+# Per-render statistics: phase timings and iteration counters.
+#
+#     with collect(kind="mandelbrot", n=800, k=300) as stats:
+#         W = render_mandelbrot(...)
+#     stats.to_dict()
+#
+# collect() makes a RenderStats current for the calling thread (every
+# Streamlit session runs on its own), and the pipeline reports into it:
+# phase() times a stage, count_work() adds the counters measured by a
+# kernel and count_escapes() describes the finished iteration array. Without
+# a current RenderStats they do nothing, so the batch jobs, tiles and
+# benchmarks pay nothing for them.
+#
+# Phases are exclusive: the time of a phase nested in another one, and the
+# JIT compilation (or loading from the disk cache) of the kernels called
+# inside, is only counted once, so the phases add up to the total.
+#
+# The kernels count their own work into an array with one row per Numba
+# thread (new_work): iterations run, pixels computed and how many of those
+# reached k. Only what actually ran is counted, so the pixels mirrored by
+# symmetry, filled by border tracing, skipped by the interior tests or the
+# resumed orbits, and the whole render on a cache hit, add nothing. The
+# iterations of each thread give the utilization of the render.
+#
+# With FRACTALES_STATS_LOG set, every render appends its statistics to that
+# file as one JSON line.
+
+PHASES = ["cache", "compile", "compute", "stats", "histogram", "colorize", "plot", "encode"]
+ESCAPE_BINS = 32
+MAX_THREADS = numba.config.NUMBA_NUM_THREADS
+STATS_LOG = os.environ.get("FRACTALES_STATS_LOG")
+
+_local = threading.local()
+_log_lock = threading.Lock()
+
+
+class RenderStats:
+    def __init__(self, **params):
+        self.params = params
+        self.started = time.time()
+        self.seconds = 0.0
+        self.phases = dict.fromkeys(PHASES, 0.0)
+        self.counters = {}
+        self.threads = 0  # Numba threads of the kernels that counted work
+        # (phase, start, seconds of the phases nested in it)
+        self._stack = []
+
+    def add(self, name, seconds):
+        # Records seconds of phase `name` spent inside the current phase
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+        if self._stack:
+            self._stack[-1][2] += seconds
+
+    @contextmanager
+    def phase(self, name):
+        self._stack.append([name, time.perf_counter(), 0.0])
+        try:
+            yield
+        finally:
+            _, start, nested = self._stack.pop()
+            elapsed = time.perf_counter() - start
+            self.add(name, elapsed - nested)
+            if self._stack:
+                # Only the exclusive part was added to the parent above
+                self._stack[-1][2] += nested
+
+    def to_dict(self):
+        counters = dict(self.counters)
+        if "thread_work" in counters:
+            work = thread_iterations(counters["thread_work"], self.threads)
+            counters.update(thread_work=work.tolist(), utilization=utilization(work))
+        return dict(
+            time=self.started, params=self.params, seconds=self.seconds,
+            phases={name: seconds for name, seconds in self.phases.items() if seconds}, **counters,
+        )
+
+    def to_json(self):
+        # One line; complex numbers and other values json cannot encode are
+        # written as their str
+        return json.dumps(self.to_dict(), default=str)
+
+
+class _CompileListener(event.Listener):
+    # Outermost sections under Numba's compiler lock on one thread: compiling
+    # a kernel or loading it from the disk cache. Other threads (the warm-up)
+    # are ignored.
+    def __init__(self, stats):
+        self.stats = stats
+        self.thread = threading.get_ident()
+        self.depth = 0
+        self.start = 0.0
+
+    def on_start(self, event):
+        if threading.get_ident() != self.thread:
+            return
+        if self.depth == 0:
+            self.start = time.perf_counter()
+        self.depth += 1
+
+    def on_end(self, event):
+        if threading.get_ident() != self.thread:
+            return
+        self.depth -= 1
+        if self.depth == 0:
+            self.stats.add("compile", time.perf_counter() - self.start)
+
+
+def current():
+    return getattr(_local, "stats", None)
+
+
+@contextmanager
+def collect(log=STATS_LOG, **params):
+    # Collects the statistics of the renders run inside; params describe
+    # the render in the exported line
+    stats = RenderStats(**params)
+    previous = current()
+    _local.stats = stats
+    start = time.perf_counter()
+    try:
+        with event.install_listener("numba:compiler_lock", _CompileListener(stats)):
+            yield stats
+    finally:
+        stats.seconds = time.perf_counter() - start
+        _local.stats = previous
+    if log:
+        write_line(stats, log)
+
+
+@contextmanager
+def phase(name):
+    stats = current()
+    if stats is None:
+        yield
+        return
+    with stats.phase(name):
+        yield
+
+
+def record(**counters):
+    stats = current()
+    if stats is not None:
+        stats.counters.update(counters)
+
+
+def count(**counters):
+    # Adds to counters of the current render, e.g. once per view that
+    # symmetry splits it into
+    stats = current()
+    if stats is not None:
+        for name, value in counters.items():
+            stats.counters[name] = stats.counters.get(name, 0) + value
+
+
+def write_line(stats, path):
+    line = stats.to_json() + "\n"
+    with _log_lock, open(path, "a", encoding="utf-8") as f:
+        f.write(line)
+
+
+def new_work():
+    # Work array for a kernel to fill with add_work (kernels.py): one row per
+    # Numba thread with the iterations run, the pixels computed and how many
+    # of those reached k
+    return np.zeros((MAX_THREADS, 3), dtype=np.int64)
+
+
+def thread_iterations(work, threads):
+    # Iterations of every thread, for the first `threads` threads and any
+    # other that did some
+    iterations = work[:, 0] if work.ndim == 2 else work
+    used = np.flatnonzero(iterations)
+    return iterations[:max(threads, used[-1] + 1 if used.size else 0)]
+
+
+def utilization(work):
+    # Fraction of the thread time spent iterating, with time ~ iterations
+    return float(work.mean() / work.max()) if work.size and work.max() > 0 else 1.0
+
+
+def count_work(work):
+    # Adds the work a kernel counted to the current render
+    stats = current()
+    if stats is None:
+        return
+    stats.threads = max(stats.threads, numba.get_num_threads())
+    count(
+        iterations=int(work[:, 0].sum()), computed_pixels=int(work[:, 1].sum()),
+        pixels_at_k=int(work[:, 2].sum()), thread_work=work[:, 0].copy(),
+    )
+
+
+def escape_histogram(W, k, bins=ESCAPE_BINS):
+    # Pixels that escaped after [edges[i], edges[i + 1]) iterations; the
+    # ones that reached k are not in it
+    counts = np.bincount(np.clip(W, 0, k).astype(np.int64).ravel(), minlength=k + 1)[:k]
+    edges = np.unique(np.linspace(0, k, min(bins, k) + 1).astype(np.int64))
+    return dict(edges=edges.tolist(), counts=np.add.reduceat(counts, edges[:-1]).tolist())
+
+
+def count_escapes(W, k):
+    # Counters of the finished iteration array W of the current render,
+    # whether it was computed or read from the cache
+    stats = current()
+    if stats is None:
+        return
+    with stats.phase("stats"):
+        W = np.asarray(W)
+        stats.counters.update(pixels=int(W.size), escape_histogram=escape_histogram(W, k))
@@ -0,0 +1,189 @@
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from utils.colorize import PngWriter, colorize
+from utils.precision import PRECISIONS
+from utils.render import (
+    ENGINES, compute_mandelbrot_view, compute_julia_view, mandelbrot_precision, julia_precision, julia_height,
+)
+
+# Out-of-core renderer for images that do not fit in memory (posters of
+# tens of thousands of pixels a side).
+#
+# The image is computed in horizontal strips of STRIP_BYTES of iterations,
+# each written to a .npy file on disk and dropped from memory. The colormap
+# is normalized with the minimum and maximum of the whole image, so the PNG
+# is written in a second pass: strips are read back from the bottom of the
+# file (the top of the image), colorized and streamed through PngWriter.
+# Only one strip is mapped at a time, so the peak memory depends on the
+# width of the image and not on its height. Every strip is computed as a
+# view of its own, so a few pixels on the edges between strips can round to
+# a different count than in a single render.
+#
+#     python -m utils.strips julia --n 50000 --k 500 --c=-0.8+0.156j --out poster.png
+
+STRIP_BYTES = 16 * 1024**2  # iteration data per strip
+OUT_OF_CORE_PIXELS = 100_000_000  # larger batch jobs are rendered in strips
+
+
+def strip_rows(w, itemsize=4, strip_bytes=STRIP_BYTES):
+    return max(1, strip_bytes // (w * itemsize))
+
+
+def _strip(path, offset, dtype, w, start, stop, mode):
+    # Rows [start, stop) of the iteration file, mapped on their own
+    itemsize = np.dtype(dtype).itemsize
+    return np.memmap(path, dtype=dtype, mode=mode, offset=offset + start * w * itemsize, shape=(stop - start, w))
+
+
+def render_strips(path, h, w, dtype, compute_rows, rows=None):
+    # Fills the .npy file `path` with the (h, w) iteration array, computing
+    # `rows` rows at a time with compute_rows(start, stop). Returns the
+    # offset of the data in the file and its minimum and maximum.
+    rows = rows or strip_rows(w, np.dtype(dtype).itemsize)
+    W = np.lib.format.open_memmap(path, mode="w+", dtype=dtype, shape=(h, w))
+    offset = W.offset
+    del W
+
+    vmin, vmax = np.inf, -np.inf
+    for start in range(0, h, rows):
+        stop = min(start + rows, h)
+        block = compute_rows(start, stop)
+        vmin = min(vmin, block.min())
+        vmax = max(vmax, block.max())
+        strip = _strip(path, offset, dtype, w, start, stop, "r+")
+        strip[:] = block
+        strip.flush()
+        del strip, block
+    return offset, vmin, vmax
+
+
+def write_png_strips(out, path, offset, h, w, dtype, cmap, vmin, vmax, rows=None):
+    # Colorizes the iteration file into the PNG `out`, written to a
+    # temporary name and renamed into place
+    rows = rows or strip_rows(w, np.dtype(dtype).itemsize)
+    directory = os.path.dirname(out) or "."
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            writer = PngWriter(f, h, w)
+            for stop in range(h, 0, -rows):
+                start = max(stop - rows, 0)
+                strip = _strip(path, offset, dtype, w, start, stop, "r")
+                writer.write_rows(colorize(np.asarray(strip), cmap, vmin, vmax))
+                del strip
+            writer.close()
+        os.replace(tmp_path, out)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def mandelbrot_rows(n, k, x_min, x_max, y_min, y_max, func_id, m, fast_interior=False, engine=ENGINES[0], smooth=False, precision=PRECISIONS[0]):
+    # compute_rows for an n x n Mandelbrot render. Every strip is rendered as
+    # its own view; the precision is resolved once for the whole image.
+    precision = mandelbrot_precision(precision, func_id, m, n, n, x_min, x_max, y_min, y_max)
+    dy = (y_max - y_min) / n
+
+    def compute_rows(start, stop):
+        h = stop - start
+        y0 = y_min + start * dy
+        y1 = y0 + h * dy
+        return compute_mandelbrot_view(h, n, k, x_min, x_max, y0, y1, func_id, m, fast_interior, engine, smooth, precision)
+
+    return n, n, compute_rows
+
+
+def julia_rows(n, k, x_min, x_max, y_min, y_max, func_id, c, m_j, fast_interior=False, engine=ENGINES[0], smooth=False, precision=PRECISIONS[0]):
+    h = julia_height(n, x_min, x_max, y_min, y_max)
+    w = n
+    precision = julia_precision(precision, func_id, m_j, h, w, x_min, x_max, y_min, y_max)
+    dy = (y_max - y_min) / h
+
+    def compute_rows(start, stop):
+        rows = stop - start
+        y0 = y_min + start * dy
+        y1 = y0 + rows * dy
+        return compute_julia_view(rows, w, k, x_min, x_max, y0, y1, func_id, c, m_j, fast_interior, engine, smooth, precision)
+
+    return h, w, compute_rows
+
+
+def render_poster(out, h, w, compute_rows, cmap="hot", smooth=False, rows=None, keep_iterations=False):
+    # Renders into out + ".npy" and writes the PNG `out`; the iteration file
+    # is removed unless keep_iterations. Returns the compute and total time.
+    dtype = np.float32 if smooth else np.int32
+    path = out + ".npy"
+    start = time.perf_counter()
+    try:
+        offset, vmin, vmax = render_strips(path, h, w, dtype, compute_rows, rows)
+        compute_time = time.perf_counter() - start
+        write_png_strips(out, path, offset, h, w, dtype, cmap, vmin, vmax, rows)
+    finally:
+        if not keep_iterations and os.path.exists(path):
+            os.remove(path)
+    return compute_time, time.perf_counter() - start
+
+
+def peak_memory():
+    # Peak resident memory of the process in bytes (Unix only)
+    import resource
+    import sys
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m utils.strips",
+        description="Renderiza imágenes muy grandes por franjas, sin tenerlas enteras en memoria.",
+    )
+    parser.add_argument("fractal", choices=["mandelbrot", "julia"])
+    parser.add_argument("--out", required=True, help="Fichero PNG de salida")
+    parser.add_argument("--n", type=int, default=20000, help="Ancho en píxeles")
+    parser.add_argument("--k", type=int, default=200)
+    parser.add_argument("--func", type=int, default=0)
+    parser.add_argument("--m", type=int, default=2)
+    parser.add_argument("--x", type=float, nargs=2, help="Por defecto, la vista de la página")
+    parser.add_argument("--y", type=float, nargs=2)
+    parser.add_argument("--c", type=complex, default=complex(0.0, -1.0), help="c de Julia, p. ej. -0.8+0.156j")
+    parser.add_argument("--color", default="hot")
+    parser.add_argument("--engine", type=int, default=0, help="Índice en ENGINES")
+    parser.add_argument("--smooth", action="store_true")
+    parser.add_argument("--precision", type=int, default=0, help="Índice en PRECISIONS")
+    parser.add_argument("--rows", type=int, help="Filas por franja (por defecto, 16 MiB de iteraciones)")
+    parser.add_argument("--keep-iterations", action="store_true", help="Conserva el fichero .npy con las iteraciones")
+    args = parser.parse_args(argv)
+
+    if args.fractal == "mandelbrot":
+        x_min, x_max = args.x or (-2.0, 1.0)
+        y_min, y_max = args.y or (-1.0, 1.0)
+        h, w, compute_rows = mandelbrot_rows(
+            args.n, args.k, x_min, x_max, y_min, y_max, args.func, args.m,
+            engine=ENGINES[args.engine], smooth=args.smooth, precision=PRECISIONS[args.precision],
+        )
+    else:
+        x_min, x_max = args.x or (-2.0, 2.0)
+        y_min, y_max = args.y or (-2.0, 2.0)
+        h, w, compute_rows = julia_rows(
+            args.n, args.k, x_min, x_max, y_min, y_max, args.func, args.c, args.m,
+            engine=ENGINES[args.engine], smooth=args.smooth, precision=PRECISIONS[args.precision],
+        )
+
+    compute_time, total_time = render_poster(
+        args.out, h, w, compute_rows, args.color, args.smooth, args.rows, args.keep_iterations
+    )
+    print(
+        f"{w}x{h} en {total_time:.1f} s (cálculo {compute_time:.1f} s), "
+        f"memoria máxima {peak_memory() / 1024**2:.0f} MiB"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+import numpy as np
+
+# Symmetry of the escape-time images: when a view straddles an axis of
+# symmetry only the larger half is computed and the rest is mirrored.
+#
+# - Mandelbrot: every formula but exp[(z^m - 1.00001 z) / sqrt(c^3)] is built
+#   from z^m, c^m, 1/c, exp, cos, sin and cosh, which commute with complex
+#   conjugation, and z starts at 0, so the count at conj(c) is the count at
+#   c: the image is symmetric about the real axis. The square root has its
+#   branch cut on negative c^3, where conjugating c does not conjugate it.
+# - Julia: all JULIA_FUNCS only see z through z^m, so for even m the count
+#   at -z is the count at z (point symmetry about the origin). With a real c
+#   they also commute with conjugation, which adds the real axis; both
+#   together give the four quadrants.
+#
+# The kernels sample the view at x_min + j * dx and y_min + i * dy, so the
+# mirror of row i is row S - i with S = -2 y_min / dy, and there is only
+# something to mirror when S is (up to rounding) an integer inside the
+# image. The mirrored samples are not bitwise the ones of a direct render:
+# S - i is rounded, and the computed part is rendered as a view of its own
+# whose edges are rounded again. Near the boundary of the set that moves a
+# few counts; measured on the default views for every formula, at most 0.2%
+# of the pixels differ (cos(z^m/c^m) at n=300). Mirrored renders are
+# therefore cached under their own key (see render.py).
+
+SYMMETRIES = ["Ninguna", "Conjugada (eje real)", "Puntual (origen)", "Ejes real e imaginario"]
+NON_CONJUGATE_FORMULAS = (4,)  # indices in MANDELBROT_FUNCS
+AXIS_TOLERANCE = 1e-6  # in pixels
+
+
+def mandelbrot_symmetry(func_id):
+    return SYMMETRIES[0] if func_id in NON_CONJUGATE_FORMULAS else SYMMETRIES[1]
+
+
+def julia_symmetry(c, m_j):
+    c = complex(c)
+    point = m_j % 2 == 0
+    conjugate = c.imag == 0
+    if point and conjugate:
+        return SYMMETRIES[3]
+    if point:
+        return SYMMETRIES[2]
+    if conjugate:
+        return SYMMETRIES[1]
+    return SYMMETRIES[0]
+
+
+def mirror_index(n, lo, hi):
+    # S such that sample S - i is the mirror of sample i across 0, or None
+    # when no sample of the n has its mirror among the others
+    d = (hi - lo) / n
+    s = -2 * lo / d
+    S = round(s)
+    if abs(s - S) > AXIS_TOLERANCE or not 1 <= S <= 2 * n - 3:
+        return None
+    return S
+
+
+def split(n, S):
+    # [start, stop) of the samples to compute, the larger side of the axis
+    # with the axis itself; the others are mirrors of samples inside it
+    if S >= n - 1:
+        return 0, S // 2 + 1
+    return (S + 1) // 2, n
+
+
+def render_symmetric(compute_view, h, w, x_min, x_max, y_min, y_max, symmetry):
+    # compute_view(h, w, x_min, x_max, y_min, y_max) renders a view; this
+    # renders the (h, w) view calling it only on the part that cannot be
+    # mirrored
+    dx = (x_max - x_min) / w
+    dy = (y_max - y_min) / h
+
+    def block(r0, r1, c0, c1):
+        # Rows [r0, r1) and columns [c0, c1) as a view of their own; the
+        # edges of the full view are passed unchanged
+        x0 = x_min + c0 * dx if c0 else x_min
+        x1 = x0 + (c1 - c0) * dx if c1 < w else x_max
+        y0 = y_min + r0 * dy if r0 else y_min
+        y1 = y0 + (r1 - r0) * dy if r1 < h else y_max
+        return compute_view(r1 - r0, c1 - c0, x0, x1, y0, y1)
+
+    Sy = mirror_index(h, y_min, y_max)
+    Sx = mirror_index(w, x_min, x_max)
+    if symmetry == SYMMETRIES[2] and Sx is None:
+        Sy = None
+    if symmetry == SYMMETRIES[0] or Sy is None:
+        if symmetry == SYMMETRIES[3] and Sx is not None:
+            return _mirror_columns(block, h, w, Sx)
+        return compute_view(h, w, x_min, x_max, y_min, y_max)
+
+    r0, r1 = split(h, Sy)
+    if symmetry == SYMMETRIES[3] and Sx is not None:
+        part = _mirror_columns(lambda a, b, c0, c1: block(r0 + a, r0 + b, c0, c1), r1 - r0, w, Sx)
+    else:
+        part = block(r0, r1, 0, w)
+    result = np.empty((h, w), dtype=part.dtype)
+    result[r0:r1] = part
+
+    # Mirrored rows, a single block on the other side of the computed one
+    m0, m1 = (r1, h) if r0 == 0 else (0, r0)
+    rows = np.arange(m0, m1)
+    if symmetry != SYMMETRIES[2]:
+        result[m0:m1] = result[Sy - rows]
+        return result
+
+    # Point symmetry also flips the columns; those whose mirror is outside
+    # the image (at most one strip on one side) are computed
+    cols = np.arange(w)
+    inside = (Sx - cols >= 0) & (Sx - cols < w)
+    result[m0:m1, inside] = result[(Sy - rows)[:, None], (Sx - cols[inside])[None, :]]
+    if not inside.all():
+        c0, c1 = (0, Sx - w + 1) if not inside[0] else (Sx + 1, w)
+        result[m0:m1, c0:c1] = block(m0, m1, c0, c1)
+    return result
+
+
+def _mirror_columns(block, h, w, Sx):
+    # Mirror across the imaginary axis: computes the larger side of the
+    # columns with block(r0, r1, c0, c1) and flips it into the other one
+    c0, c1 = split(w, Sx)
+    part = block(0, h, c0, c1)
+    result = np.empty((h, w), dtype=part.dtype)
+    result[:, c0:c1] = part
+    m0, m1 = (c1, w) if c0 == 0 else (0, c0)
+    result[:, m0:m1] = result[:, Sx - np.arange(m0, m1)]
+    return result
@@ -0,0 +1,262 @@
+import argparse
+import json
+import os
+import re
+import threading
+from collections import Counter, OrderedDict
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from utils.render import compute_mandelbrot_numba, compute_julia_numba
+from utils.formulas import MANDELBROT_FUNCS, JULIA_FUNCS
+from utils.cache import render_cache
+from utils.colorize import colorize, encode_png
+
+# XYZ tile server: 256x256 PNG tiles of the Mandelbrot and Julia sets
+# addressed like a slippy map, /mandelbrot/{z}/{x}/{y}.png?func=0&m=2&k=200.
+#
+# At zoom z the world square is split into 2^z x 2^z tiles, x growing to the
+# right and y downwards. A map viewer only asks for the tiles it shows, so
+# panning and zooming compute new tiles instead of whole frames.
+#
+# Tiles are looked up in three places: an in-memory LRU of encoded PNGs, the
+# disk cache of iteration arrays (shared with the app, so changing the
+# palette does not recompute) and finally the kernels, run in a thread or
+# process pool. Requests for a tile that is already being computed wait for
+# that computation instead of starting another one.
+#
+#     python -m utils.tiles --port 8765
+
+TILE_SIZE = 256
+MAX_ZOOM = 40  # float64 pixels stop being distinct a few levels deeper
+MEMORY_TILES = 2048  # encoded PNGs kept in memory, ~10-50 KB each
+TILE_HOST = os.environ.get("FRACTALES_TILE_HOST", "localhost")
+TILE_PORT = int(os.environ.get("FRACTALES_TILE_PORT", 8765))
+# Address the browser uses to reach the server, when it is not host:port
+TILE_URL = os.environ.get("FRACTALES_TILE_URL")
+
+# (x_min, x_max, y_min, y_max) of the zoom 0 tile
+MANDELBROT_WORLD = (-2.5, 1.5, -2.0, 2.0)
+JULIA_WORLD = (-2.0, 2.0, -2.0, 2.0)
+
+TILE_PATH = re.compile(r"^/(mandelbrot|julia)/(\d+)/(\d+)/(\d+)\.png$")
+
+
+def tile_bounds(world, z, x, y):
+    x_min, x_max, y_min, y_max = world
+    scale = 0.5**z
+    width = (x_max - x_min) * scale
+    height = (y_max - y_min) * scale
+    top = y_max - y * height
+    left = x_min + x * width
+    return left, left + width, top - height, top
+
+
+def tile_array(fractal, func_id, m, c, k, z, x, y, smooth):
+    # Iteration counts of a tile. Pixels are sampled like the kernels do, at
+    # x_min + j * dx, so neighbouring tiles line up without seams.
+    world = MANDELBROT_WORLD if fractal == "mandelbrot" else JULIA_WORLD
+    x_min, x_max, y_min, y_max = tile_bounds(world, z, x, y)
+
+    def compute():
+        # fast_interior gives the same counts and most tiles of a zoomed-in
+        # view are full of interior points
+        if fractal == "mandelbrot":
+            return compute_mandelbrot_numba(
+                TILE_SIZE, TILE_SIZE, k, x_min, x_max, y_min, y_max, func_id, m, True, smooth
+            )
+        return compute_julia_numba(
+            TILE_SIZE, TILE_SIZE, k, x_min, x_max, y_min, y_max, func_id, c, m, True, smooth
+        )
+
+    return render_cache.get_or_compute(
+        compute, kind="tile", fractal=fractal, func_id=func_id, m=m, c=c, k=k,
+        z=z, x=x, y=y, smooth=smooth,
+    )
+
+
+def tile_png(params):
+    # Top level so it can run in a process pool. The colormap range is fixed
+    # to [0, k] for every tile, otherwise each tile would be normalized to
+    # its own range and the seams would show.
+    fractal, func_id, m, c, k, z, x, y, smooth, color = params
+    W = tile_array(fractal, func_id, m, c, k, z, x, y, smooth)
+    return encode_png(colorize(W, color, vmin=0, vmax=k))
+
+
+class TileService:
+    def __init__(self, workers=None, processes=False, memory_tiles=MEMORY_TILES):
+        executor = ProcessPoolExecutor if processes else ThreadPoolExecutor
+        self._executor = executor(max_workers=workers)
+        self.memory_tiles = memory_tiles
+        self._memory = OrderedDict()
+        self._pending = {}
+        # The done callback runs in the submitting thread when the future
+        # has already finished
+        self._lock = threading.RLock()
+        self.stats = Counter()
+
+    def get(self, params):
+        # PNG bytes of a tile; params as in tile_png
+        with self._lock:
+            png = self._memory.get(params)
+            if png is not None:
+                self._memory.move_to_end(params)
+                self.stats["memory"] += 1
+                return png
+            future = self._pending.get(params)
+            if future is None:
+                self.stats["computed"] += 1
+                future = self._executor.submit(tile_png, params)
+                self._pending[params] = future
+                future.add_done_callback(lambda f: self._done(params, f))
+            else:
+                self.stats["coalesced"] += 1
+        return future.result()
+
+    def _done(self, params, future):
+        with self._lock:
+            self._pending.pop(params, None)
+            if future.cancelled() or future.exception() is not None:
+                return
+            self._memory[params] = future.result()
+            while len(self._memory) > self.memory_tiles:
+                self._memory.popitem(last=False)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def parse_tile_request(path):
+    # Path and query of a tile URL -> params for TileService.get. Raises
+    # ValueError for anything that is not a valid tile.
+    url = urlsplit(path)
+    match = TILE_PATH.match(url.path)
+    if match is None:
+        raise ValueError("Ruta de tesela no válida")
+    fractal = match.group(1)
+    z, x, y = (int(v) for v in match.groups()[1:])
+    if z > MAX_ZOOM or x >= 1 << z or y >= 1 << z:
+        raise ValueError("Tesela fuera del mapa")
+
+    query = {name: values[-1] for name, values in parse_qs(url.query).items()}
+    func_id = int(query.get("func", 0))
+    m = int(query.get("m", 2))
+    k = int(query.get("k", 100))
+    smooth = query.get("smooth", "0") in ("1", "true")
+    color = query.get("color", "hot")
+    if fractal == "mandelbrot":
+        if not 0 <= func_id < len(MANDELBROT_FUNCS):
+            raise ValueError("Función desconocida")
+        c = 0j
+    else:
+        if not 0 <= func_id < len(JULIA_FUNCS):
+            raise ValueError("Función desconocida")
+        c = complex(*(float(v) for v in query.get("c", "0,-1").split(",")))
+    if not 1 <= m <= 64 or not 1 <= k <= 100_000:
+        raise ValueError("Parámetros fuera de rango")
+
+    import matplotlib
+
+    if color not in matplotlib.colormaps:
+        raise ValueError("Paleta desconocida")
+    return fractal, func_id, m, c, k, z, x, y, smooth, color
+
+
+def tile_url(base, fractal, func_id, m, k, color, c=None, smooth=False):
+    # Leaflet URL template for a tile layer
+    query = f"func={func_id}&m={m}&k={k}&color={color}&smooth={int(smooth)}"
+    if c is not None:
+        query += f"&c={c.real!r},{c.imag!r}"
+    return f"{base}/{fractal}/{{z}}/{{x}}/{{y}}.png?{query}"
+
+
+def map_html(url, height=600):
+    # Pan/zoom viewer for a tile layer. CRS.Simple maps the tile grid onto
+    # plain pixel coordinates: the whole world is the 256 x 256 square at
+    # zoom 0.
+    return f"""
+<link rel="stylesheet" href="https://unpkg.com/leaflet@1.9.4/dist/leaflet.css"/>
+<script src="https://unpkg.com/leaflet@1.9.4/dist/leaflet.js"></script>
+<div id="map" style="height: {height}px; background: #000;"></div>
+<script>
+  var bounds = [[-{TILE_SIZE}, 0], [0, {TILE_SIZE}]];
+  var map = L.map("map", {{crs: L.CRS.Simple, minZoom: 0, maxZoom: {MAX_ZOOM}, zoomSnap: 1}});
+  L.tileLayer({json.dumps(url)}, {{
+    tileSize: {TILE_SIZE}, bounds: bounds, noWrap: true, maxNativeZoom: {MAX_ZOOM}
+  }}).addTo(map);
+  map.fitBounds(bounds);
+</script>
+"""
+
+
+def make_handler(service):
+    class TileHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if urlsplit(self.path).path == "/":
+                base = f"http://{self.headers.get('Host', f'{TILE_HOST}:{TILE_PORT}')}"
+                body = map_html(tile_url(base, "mandelbrot", 0, 2, 200, "hot"), 800).encode()
+                return self._send(200, "text/html; charset=utf-8", body)
+            try:
+                params = parse_tile_request(self.path)
+            except ValueError as e:
+                return self._send(404, "text/plain; charset=utf-8", str(e).encode())
+            try:
+                png = service.get(params)
+            except Exception as e:
+                # The failed computation is not cached, a later request retries it
+                message = f"Error al calcular la tesela: {e}"
+                return self._send(500, "text/plain; charset=utf-8", message.encode())
+            self._send(200, "image/png", png, cache=True)
+
+        def _send(self, status, content_type, body, cache=False):
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            # The app embeds the map from a different origin
+            self.send_header("Access-Control-Allow-Origin", "*")
+            if cache:
+                self.send_header("Cache-Control", "public, max-age=86400")
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return TileHandler
+
+
+def start_server(host=TILE_HOST, port=TILE_PORT, workers=None, processes=False):
+    # Serves tiles from a daemon thread; returns the server, whose
+    # `service` attribute holds the tile cache and its counters
+    service = TileService(workers, processes)
+    server = ThreadingHTTPServer((host, port), make_handler(service))
+    server.daemon_threads = True
+    server.service = service
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m utils.tiles",
+        description="Servidor de teselas XYZ de los conjuntos de Mandelbrot y Julia.",
+    )
+    parser.add_argument("--host", default=TILE_HOST)
+    parser.add_argument("--port", type=int, default=TILE_PORT)
+    parser.add_argument("--workers", type=int, help="Tamaño del pool de cálculo")
+    parser.add_argument("--processes", action="store_true", help="Calcula las teselas en procesos en lugar de hilos")
+    args = parser.parse_args(argv)
+
+    server = start_server(args.host, args.port, args.workers, args.processes)
+    print(f"Sirviendo teselas en http://{args.host}:{args.port}/")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+        server.service.shutdown()
+
+
+if __name__ == "__main__":
+    main()
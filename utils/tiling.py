@@ -0,0 +1,162 @@
+import numba
+import numpy as np
+from numba import jit, prange
+
+from utils.kernels import FORMULAS, JULIA_FORMULAS, ITERATE, by_formula
+
+# Mariani–Silver (border tracing) renderer.
+#
+# The image is split into square tiles that are processed in parallel. For
+# every rectangle only the border is iterated; if all border pixels share the
+# same iteration count the interior is filled with it, otherwise the
+# rectangle is split in four (sharing the dividing lines) and traced again.
+# This relies on the escape-time level sets being connected, which holds for
+# the polynomial formulas (z^m + c and z^m + 1/c) only, so the transcendental
+# ones, whose level sets have holes, are left to the pixel by pixel kernels.
+# Even for those the borders are sampled, not continuous: a filament
+# thinner than a pixel that crosses a rectangle between two border samples
+# is filled over. On the default views that is a handful of isolated pixels
+# (at most 10 at n=801), against up to 66 for the transcendental formulas.
+
+MIN_SIZE = 4  # Rectangles this thin are computed pixel by pixel
+TILED_FORMULAS = (0, 1)  # indices in FORMULAS
+STACK_SIZE = 256
+
+
+def make_mandelbrot_pixel(f):
+    @jit(nopython=True, fastmath=True, cache=True)
+    def pixel(x, y, c, k, m, bailout2):
+        n, _, steps = ITERATE(f, 0.0j, complex(x, y), 0, k, m, bailout2)
+        return n, steps
+
+    return pixel
+
+
+def make_julia_pixel(f):
+    @jit(nopython=True, fastmath=True, cache=True)
+    def pixel(x, y, c, k, m, bailout2):
+        n, _, steps = ITERATE(f, complex(x, y), c, 0, k, m, bailout2)
+        return n, steps
+
+    return pixel
+
+
+# pixel(x, y, c, k, m, bailout2) -> (n, steps run) of every formula, called
+# as PIXEL(p, ...) with p from MANDELBROT_PIXELS / JULIA_PIXELS
+PIXEL_FUNCS = (
+    [make_mandelbrot_pixel(f) for f in range(len(FORMULAS))]
+    + [make_julia_pixel(f) for f in range(len(FORMULAS))]
+)
+PIXEL = by_formula(PIXEL_FUNCS)
+MANDELBROT_PIXELS = list(range(len(FORMULAS)))  # by func_id
+JULIA_PIXELS = [len(FORMULAS) + f for f in JULIA_FORMULAS]
+
+
+def make_value_at(p):
+    @jit(nopython=True, fastmath=True, cache=True)
+    def value_at(result, i, j, x_min, y_min, dx, dy, c, k, m, bailout2, counts):
+        # Returns the iteration count of (i, j); when it has to be computed,
+        # adds to counts like add_work does
+        if result[i, j] >= 0:
+            return result[i, j]
+        n, steps = PIXEL(p, x_min + j * dx, y_min + i * dy, c, k, m, bailout2)
+        result[i, j] = n
+        counts[0] += steps
+        counts[1] += 1
+        counts[2] += n >= k
+        return n
+
+    return value_at
+
+
+VALUE_AT = by_formula([make_value_at(p) for p in range(len(PIXEL_FUNCS))])
+
+
+def make_trace_tile(p):
+    @jit(nopython=True, fastmath=True, cache=True)
+    def trace_tile(result, r0, r1, c0, c1, x_min, y_min, dx, dy, c, k, m, bailout2, counts):
+        stack = np.empty((STACK_SIZE, 4), dtype=np.int64)
+        stack[0, 0] = r0
+        stack[0, 1] = r1
+        stack[0, 2] = c0
+        stack[0, 3] = c1
+        top = 1
+
+        while top > 0:
+            top -= 1
+            r0 = stack[top, 0]
+            r1 = stack[top, 1]
+            c0 = stack[top, 2]
+            c1 = stack[top, 3]
+
+            # Border
+            first = VALUE_AT(p, result, r0, c0, x_min, y_min, dx, dy, c, k, m, bailout2, counts)
+            uniform = True
+            for j in range(c0, c1 + 1):
+                v = VALUE_AT(p, result, r0, j, x_min, y_min, dx, dy, c, k, m, bailout2, counts)
+                uniform = uniform and v == first
+                v = VALUE_AT(p, result, r1, j, x_min, y_min, dx, dy, c, k, m, bailout2, counts)
+                uniform = uniform and v == first
+            for i in range(r0 + 1, r1):
+                v = VALUE_AT(p, result, i, c0, x_min, y_min, dx, dy, c, k, m, bailout2, counts)
+                uniform = uniform and v == first
+                v = VALUE_AT(p, result, i, c1, x_min, y_min, dx, dy, c, k, m, bailout2, counts)
+                uniform = uniform and v == first
+
+            if uniform:
+                for i in range(r0 + 1, r1):
+                    for j in range(c0 + 1, c1):
+                        result[i, j] = first
+            elif r1 - r0 <= MIN_SIZE or c1 - c0 <= MIN_SIZE:
+                for i in range(r0 + 1, r1):
+                    for j in range(c0 + 1, c1):
+                        VALUE_AT(p, result, i, j, x_min, y_min, dx, dy, c, k, m, bailout2, counts)
+            else:
+                rm = (r0 + r1) // 2
+                cm = (c0 + c1) // 2
+                for ra, rb, ca, cb in ((r0, rm, c0, cm), (r0, rm, cm, c1),
+                                       (rm, r1, c0, cm), (rm, r1, cm, c1)):
+                    stack[top, 0] = ra
+                    stack[top, 1] = rb
+                    stack[top, 2] = ca
+                    stack[top, 3] = cb
+                    top += 1
+
+    return trace_tile
+
+
+TRACE_TILE = by_formula([make_trace_tile(p) for p in range(len(PIXEL_FUNCS))])
+
+
+def make_tiled_kernel(p):
+    @jit(nopython=True, fastmath=True, parallel=True, cache=True)
+    def kernel(h, w, k, x_min, x_max, y_min, y_max, c, m, bailout2, tile, work):
+        # -1 marks pixels that have not been computed yet
+        result = np.full((h, w), -1, dtype=np.int32)
+
+        dx = (x_max - x_min) / w
+        dy = (y_max - y_min) / h
+
+        tiles_y = (h + tile - 1) // tile
+        tiles_x = (w + tile - 1) // tile
+
+        for t in prange(tiles_y * tiles_x):
+            r0 = (t // tiles_x) * tile
+            c0 = (t % tiles_x) * tile
+            r1 = min(r0 + tile, h) - 1
+            c1 = min(c0 + tile, w) - 1
+            TRACE_TILE(
+                p, result, r0, r1, c0, c1, x_min, y_min, dx, dy, c, k, m, bailout2, work[numba.get_thread_id()]
+            )
+
+        return result
+
+    return kernel
+
+
+# Only for the formulas in TILED_FORMULAS, by func_id
+MANDELBROT_TILED_KERNELS = {f: make_tiled_kernel(MANDELBROT_PIXELS[f]) for f in TILED_FORMULAS}
+JULIA_TILED_KERNELS = {
+    func_id: make_tiled_kernel(JULIA_PIXELS[func_id])
+    for func_id, f in enumerate(JULIA_FORMULAS) if f in TILED_FORMULAS
+}
@@ -0,0 +1,132 @@
+import threading
+import time
+
+from numba import types
+
+from utils.kernels import (
+    MANDELBROT_KERNELS, JULIA_KERNELS, MANDELBROT_SMOOTH_KERNELS, JULIA_SMOOTH_KERNELS,
+    MANDELBROT_STATE_KERNELS, JULIA_STATE_KERNELS, smooth_from_state, pixel_grid,
+)
+from utils.tiling import MANDELBROT_TILED_KERNELS, JULIA_TILED_KERNELS
+from utils.progressive import MANDELBROT_STRIDE_KERNELS, JULIA_STRIDE_KERNELS
+from utils.scheduling import MANDELBROT_SCHEDULED_KERNELS, JULIA_SCHEDULED_KERNELS
+from utils.lanes import (
+    MANDELBROT_LANE_KERNELS, JULIA_LANE_KERNELS, MANDELBROT_SMOOTH_LANE_KERNELS, JULIA_SMOOTH_LANE_KERNELS,
+)
+from utils.distance import MANDELBROT_DISTANCE_KERNELS, JULIA_DISTANCE_KERNELS
+from utils.antialias import MANDELBROT_SUPERSAMPLE_KERNELS, JULIA_SUPERSAMPLE_KERNELS
+from utils.histogram import iteration_histogram
+from utils.precision import (
+    MANDELBROT_FLOAT32_KERNELS, JULIA_FLOAT32_KERNELS, MANDELBROT_SMOOTH_FLOAT32_KERNELS,
+    JULIA_SMOOTH_FLOAT32_KERNELS,
+)
+
+# JIT warm-up: compiles the kernels ahead of the first render.
+#
+# Every kernel is compiled for the exact argument types the render functions
+# pass (Python ints are int64, floats float64, c complex128, arrays
+# C-contiguous), so the first real call finds the compiled version. With
+# cache=True the compilation is paid once per machine and later processes
+# only load it from __pycache__, which takes a few milliseconds per kernel.
+#
+# Kernels are compiled in order of how likely they are to be needed first:
+# the default formula of both pages on the default (incremental) path, then
+# the rest of the formulas, then the optional engines. compile() does not
+# run anything, so warming up in a background thread never starts Numba's
+# thread pool outside the main thread.
+#
+#     python -m utils.warmup
+
+VIEW = "int64, int64, int64, float64, float64, float64, float64"
+GRID = "complex128[:, ::1], int32[:, ::1], int64"
+WORK = "int64[:, ::1]"
+
+MANDELBROT = f"({VIEW}, int64, boolean, {WORK})"
+JULIA = f"({VIEW}, complex128, int64, boolean, {WORK})"
+MANDELBROT_STATE = f"({GRID}, float64, float64, float64, float64, int64, boolean, {WORK})"
+JULIA_STATE = f"({GRID}, complex128, int64, boolean, {WORK})"
+SMOOTH_FROM_STATE = "(complex128[:, ::1], int32[:, ::1], int64, int64, float64)"
+PIXEL_GRID = "(int64, int64, float64, float64, float64, float64)"
+STRIDE = f"(int32[:, ::1], int64, int64, float64, float64, float64, float64, complex128, int64, float64, {WORK})"
+TILED = f"({VIEW}, complex128, int64, float64, int64, {WORK})"
+SCHEDULED = f"(int64[::1], int64, int64, float64, float64, float64, float64, complex128, int64, float64, {WORK})"
+SUPERSAMPLE = "int64[::1], int64[::1], int64, int64, int64, float64, float64, float64, float64"
+MANDELBROT_SUPERSAMPLE = f"({SUPERSAMPLE}, int64, float64[:, ::1], {WORK})"
+JULIA_SUPERSAMPLE = f"({SUPERSAMPLE}, complex128, int64, float64[:, ::1], {WORK})"
+HISTOGRAM = "(int32[:, ::1], int64, int64)"
+# Counts read back from the disk cache are read-only arrays
+HISTOGRAM_CACHED = (types.Array(types.int32, 2, "C", readonly=True), types.int64, types.int64)
+
+
+def warmup_plan():
+    # (kernel, signature) pairs in priority order
+    plan = [
+        (MANDELBROT_STATE_KERNELS[0], MANDELBROT_STATE),
+        (pixel_grid, PIXEL_GRID),
+        (JULIA_STATE_KERNELS[0], JULIA_STATE),
+        (smooth_from_state, SMOOTH_FROM_STATE),
+        (iteration_histogram, HISTOGRAM),
+        (iteration_histogram, HISTOGRAM_CACHED),
+    ]
+    plan += [(kernel, MANDELBROT_STATE) for kernel in MANDELBROT_STATE_KERNELS[1:]]
+    plan += [(kernel, JULIA_STATE) for kernel in JULIA_STATE_KERNELS[1:]]
+    for kernels, signature in (
+        (MANDELBROT_STRIDE_KERNELS, STRIDE),
+        (JULIA_STRIDE_KERNELS, STRIDE),
+        (MANDELBROT_KERNELS, MANDELBROT),
+        (JULIA_KERNELS, JULIA),
+        (MANDELBROT_SMOOTH_KERNELS, MANDELBROT),
+        (JULIA_SMOOTH_KERNELS, JULIA),
+        (list(MANDELBROT_TILED_KERNELS.values()), TILED),
+        (list(JULIA_TILED_KERNELS.values()), TILED),
+        (MANDELBROT_SCHEDULED_KERNELS, SCHEDULED),
+        (JULIA_SCHEDULED_KERNELS, SCHEDULED),
+        (list(MANDELBROT_LANE_KERNELS.values()), MANDELBROT),
+        (list(JULIA_LANE_KERNELS.values()), JULIA),
+        (list(MANDELBROT_SMOOTH_LANE_KERNELS.values()), MANDELBROT),
+        (list(JULIA_SMOOTH_LANE_KERNELS.values()), JULIA),
+        (list(MANDELBROT_FLOAT32_KERNELS.values()), MANDELBROT),
+        (list(JULIA_FLOAT32_KERNELS.values()), JULIA),
+        (list(MANDELBROT_SMOOTH_FLOAT32_KERNELS.values()), MANDELBROT),
+        (list(JULIA_SMOOTH_FLOAT32_KERNELS.values()), JULIA),
+        (list(MANDELBROT_DISTANCE_KERNELS.values()), MANDELBROT),
+        (list(JULIA_DISTANCE_KERNELS.values()), JULIA),
+        (MANDELBROT_SUPERSAMPLE_KERNELS, MANDELBROT_SUPERSAMPLE),
+        (JULIA_SUPERSAMPLE_KERNELS, JULIA_SUPERSAMPLE),
+    ):
+        plan += [(kernel, signature) for kernel in kernels]
+    return plan
+
+
+def warmup(plan=None):
+    # Compiles (or loads from the disk cache) every kernel of the plan;
+    # returns the number of kernels and the time taken
+    plan = warmup_plan() if plan is None else plan
+    start = time.perf_counter()
+    for kernel, signature in plan:
+        kernel.compile(signature)
+    return len(plan), time.perf_counter() - start
+
+
+_started = None
+_lock = threading.Lock()
+
+
+def start_warmup():
+    # Starts the warm-up in a daemon thread, once per process; returns the
+    # thread
+    global _started
+    with _lock:
+        if _started is None:
+            _started = threading.Thread(target=warmup, name="numba-warmup", daemon=True)
+            _started.start()
+    return _started
+
+
+def main():
+    done, seconds = warmup()
+    print(f"{done} kernels compilados en {seconds:.1f} s")
+
+
+if __name__ == "__main__":
+    main()